@@ -6,10 +6,13 @@ from .dat_writer import write_dat
 from .lep_reader import read_lep
 from .linebreak_reader import read_linebreak
 from .linebreak_writer import write_linebreak
-from .image_reader import read_image
-from .image_writer import write_image
-from .normalize import normalize_color_numbers, normalize_bitmap_data
-from .check import check, check_pattern, KnitPaintCheckException
+from .linebreak_corpus import read_linebreak_corpus, write_linebreak_corpus, LinebreakCorpus
+from .pattern_store import PatternStore
+from .lzss import lzss_compress, lzss_decompress, LZSSEncoder, LZSSDecoder
+from .image_reader import read_image, read_image_header
+from .image_writer import write_image, render_image
+from .normalize import normalize_color_numbers, remap_color_numbers, normalize_bitmap_data, normalize_bitmap_data_dir
+from .check import check, check_pattern, check_many, KnitPaintCheckException
 
 
 class KnitPaint:
@@ -17,7 +20,7 @@ class KnitPaint:
     Represents a KnitPaint file with all its attributes following the dat specification
     """
 
-    def __init__(self, input_file=None):
+    def __init__(self, input_file=None, lazy=False):
         """
         Initializes an instance by either reading the file with the provided filename, loading the provided numpy array
         or using default values
@@ -27,6 +30,10 @@ class KnitPaint:
         - String representing the path to a dat, lep or image file
         - Byte-Array containing the contents of a dat file
         - numpy.ndarray containing the bitmap-data
+
+        :param lazy:
+        Set to True to only read the header of the input file. The bitmap data is decoded on first access. Only
+        supported for image files.
         """
         # Default header
         self.header_x_start = 0
@@ -53,22 +60,60 @@ class KnitPaint:
         self.resolution_y_den = 0
         self.resolution_y_nom = 0
 
-        # Default bitmap-data: all black
-        self.bitmap_data = [0] * (490 * 406)
+        # Default bitmap-data: all black. Stored as contiguous uint8 matrix of shape (height, width). Nothing is
+        # allocated if the bitmap data is read from an input.
+        self._bitmap = np.zeros((406, 490), dtype=np.uint8) if input_file is None else None
+
+        # Input file that will be decoded on first access of the bitmap data in lazy mode
+        self._lazy_input_file = None
 
         # Read input file if given
         if input_file is not None:
             if isinstance(input_file, np.ndarray):
                 self.set_np_bitmap_data(input_file)
-            elif isinstance(input_file, str):
-                if input_file.lower().endswith('dat'):
-                    self.read_dat(input_file)
-                elif input_file.lower().endswith('lep'):
-                    self.read_lep(input_file)
-                else:
-                    self.read_image(input_file)
+            elif lazy:
+                self._read_input_file_header(input_file)
+                self._lazy_input_file = input_file
             else:
+                self._read_input_file(input_file)
+
+    def _read_input_file(self, input_file):
+        """
+        Reads all information from the provided input file using the reader matching its type
+        :param input_file:
+        :return:
+        """
+        if isinstance(input_file, str):
+            if input_file.lower().endswith('dat'):
                 self.read_dat(input_file)
+            elif input_file.lower().endswith('lep'):
+                self.read_lep(input_file)
+            else:
+                self.read_image(input_file)
+        else:
+            self.read_dat(input_file)
+
+    def _read_input_file_header(self, input_file):
+        """
+        Reads only the header information from the provided image file. The header of dat and lep files can not be read
+        without decoding the whole file.
+        :param input_file:
+        :return:
+        """
+        if not isinstance(input_file, str) or input_file.lower().endswith(('dat', 'lep')):
+            raise ValueError('Only image files can be read lazily')
+        read_image_header(input_file, dst=self)
+
+    def _get_bitmap(self):
+        """
+        Returns the stored bitmap matrix. Decodes the input file first if it was opened in lazy mode.
+        :return:
+        """
+        if self._lazy_input_file is not None:
+            lazy_input_file = self._lazy_input_file
+            self._lazy_input_file = None
+            self._read_input_file(lazy_input_file)
+        return self._bitmap
 
     def __eq__(self, other):
         """
@@ -76,27 +121,63 @@ class KnitPaint:
         :param other:
         :return:
         """
+        self._get_bitmap()
+        other._get_bitmap()
         for key in self.__dict__.keys():
-            if key not in other.__dict__ or self.__dict__[key] != other.__dict__[key]:
+            if key not in other.__dict__:
+                print(key)
+                return False
+            value = self.__dict__[key]
+            other_value = other.__dict__[key]
+            if isinstance(value, np.ndarray) or isinstance(other_value, np.ndarray):
+                equal = np.array_equal(value, other_value)
+            else:
+                equal = value == other_value
+            if not equal:
                 print(key)
                 return False
         return True
 
-    def set_bitmap_data(self, bitmap_data, width, height):
+    @property
+    def bitmap_data(self):
+        """
+        Returns the bitmap data as flat list of color numbers. The list is created on demand, use get_np_bitmap_data
+        to access the data without conversion.
+        :return:
+        """
+        return self._get_bitmap().ravel().tolist()
+
+    @bitmap_data.setter
+    def bitmap_data(self, bitmap_data):
         """
-        Sets new bitmap data and updates the header information
+        Replaces the bitmap data with a flat sequence of color numbers keeping the current width and height
         :param bitmap_data:
+        :return:
+        """
+        self.set_bitmap_data(bitmap_data, self.get_width(), self.get_height())
+
+    def set_bitmap_data(self, bitmap_data, width, height):
+        """
+        Sets new bitmap data and updates the header information. Raises a ValueError if the data does not match the
+        dimensions or contains color numbers outside of 0 to 255.
+        :param bitmap_data: Flat list, bytes or numpy array of color numbers from 0 to 255
         :param width:
         :param height:
         :return:
         """
-        if len(bitmap_data) == width*height:
-            self.bitmap_data = bitmap_data
-            self.header_x_end = self.header_x_start + width - 1
-            self.header_y_end = self.header_y_start + height - 1
+        if isinstance(bitmap_data, (bytes, bytearray, memoryview)):
+            bitmap_np = np.frombuffer(bitmap_data, dtype=np.uint8)
         else:
-            print('Error: Bitmap data was not set because the dimensions were incorrect. '
-                  + 'Bitmap data length is ' + str(len(bitmap_data)) + ' and should be ' + str(width*height) + '.')
+            bitmap_np = np.asarray(bitmap_data).ravel()
+            if bitmap_np.dtype != np.uint8 and bitmap_np.size > 0 and (bitmap_np.min() < 0 or bitmap_np.max() > 255):
+                raise ValueError('Bitmap data contains color numbers outside of 0 to 255')
+        if bitmap_np.size != width*height:
+            raise ValueError('Bitmap data was not set because the dimensions were incorrect. Bitmap data length is '
+                             + str(bitmap_np.size) + ' and should be ' + str(width*height) + '.')
+        self._bitmap = np.array(bitmap_np.reshape((height, width)), dtype=np.uint8, order='C')
+        self._lazy_input_file = None
+        self.header_x_end = self.header_x_start + width - 1
+        self.header_y_end = self.header_y_start + height - 1
 
     def set_np_bitmap_data(self, bitmap_data, bottom_to_top=False):
         """
@@ -114,9 +195,8 @@ class KnitPaint:
         """
         if bottom_to_top:
             bitmap_data = np.flipud(bitmap_data)
-        new_bitmap_data = list(bitmap_data.flatten().tolist())
         height, width = bitmap_data.shape
-        self.set_bitmap_data(new_bitmap_data, width, height)
+        self.set_bitmap_data(bitmap_data, width, height)
 
     def read_dat(self, input_file):
         """
@@ -164,7 +244,7 @@ class KnitPaint:
         :param verbose:
         :return:
         """
-        write_linebreak(self, output_filename=output_filename, linebreak_char=linebreak_char, verbose=verbose)
+        return write_linebreak(self, output_filename=output_filename, linebreak_char=linebreak_char, verbose=verbose)
 
     def read_image(self, image_filename):
         """
@@ -174,14 +254,27 @@ class KnitPaint:
         """
         return read_image(image_filename, dst=self)
 
-    def write_image(self, output_filename, verbose=True):
+    def write_image(self, output_filename, verbose=True, scale=1):
         """
         Builds a preview image of the provided KnitPaint file using Numpy and OpenCV
         :param output_filename:
         :param verbose: Set to False to disable logging on success
+        :param scale: Number of pixels per stitch in each direction
+        :return:
+        """
+        write_image(self, output_filename, verbose, scale=scale)
+
+    def render_image(self, image_format=None, scale=1, bottom_to_top=True, quality=None):
+        """
+        Renders a preview image in memory. Returns the encoded bytes if a format like 'png' is provided, otherwise
+        returns an RGB numpy array
+        :param image_format:
+        :param scale: Number of pixels per stitch in each direction
+        :param bottom_to_top:
+        :param quality: Optional JPEG quality from 0 to 100
         :return:
         """
-        write_image(self, output_filename, verbose)
+        return render_image(self, image_format, scale=scale, bottom_to_top=bottom_to_top, quality=quality)
 
     def get_width(self):
         """
@@ -199,7 +292,8 @@ class KnitPaint:
 
     def get_np_bitmap_data(self, bottom_to_top=False):
         """
-        Returns the bitmap data as a numpy matrix
+        Returns the bitmap data as a numpy matrix of type uint8. The matrix is a view on the stored data, so changes to
+        it will modify this KnitPaint. Copy it if that is not intended.
 
         :param bottom_to_top:
         Defines if instructions should go from bottom to top. Set this to true if you want the matrix to have the same
@@ -207,13 +301,10 @@ class KnitPaint:
 
         :return:
         """
-        current_height = self.get_height()
-        current_width = self.get_width()
-        bitmap_np = np.array(self.bitmap_data, dtype=int)
-        bitmap_np_shaped = np.reshape(bitmap_np, (current_height, current_width))
+        bitmap_np = self._get_bitmap()
         if bottom_to_top:
-            bitmap_np_shaped = np.flipud(bitmap_np_shaped)
-        return bitmap_np_shaped
+            return np.flipud(bitmap_np)
+        return bitmap_np
 
     def normalize_color_numbers(self):
         """
@@ -222,6 +313,15 @@ class KnitPaint:
         """
         return normalize_color_numbers(self)
 
+    def remap_color_numbers(self, mapping):
+        """
+        Replaces color numbers according to the provided mapping. Modifies the bitmap data in place.
+        :param mapping: dict mapping source to destination color numbers or a lookup table with 256 entries
+        :return:
+        """
+        remap_color_numbers(self.get_np_bitmap_data(), mapping)
+        return self
+
     def normalize_bitmap_data(self, has_option_line=True, option_line='keep'):
         """
         Crops the bitmap data by removing all the "black" around the edges. Optionally modifies the option line
@@ -262,7 +362,7 @@ class KnitPaint:
         :return:
         """
         height = self.get_height()
-        char_col = (np.ones((height, 1)) * char).astype(int)
+        char_col = np.full((height, 1), char, dtype=np.uint8)
         self.add_col(char_col, right)
 
     def find_unused_chars(self):
@@ -287,20 +387,24 @@ class KnitPaint:
         warnings.warn('"check_syntax" is deprecated, use "check" instead', DeprecationWarning)
         return self.check()
 
-    def check(self):
+    def check(self, stop_at=None, ignore=()):
         """
         Checks the current knitpaint by virtually performing the actual knitting. Raises a KnitpaintCheckException
-        containing a list of problems that occurred. Returns a list of loop if no problems occurred
+        containing a list of problems that occurred. Returns the table of loops if no problems occurred
+        :param stop_at: Problem class or tuple of problem classes that stop the check as soon as such a problem occurs
+        :param ignore: Tuple of warning classes that are not checked for
         :return:
         """
-        return check(self)
+        return check(self, stop_at=stop_at, ignore=ignore)
 
-    def check_as_pattern(self):
+    def check_as_pattern(self, stop_at=None, ignore=()):
         """
         Checks if the provided knitpaint can be knitted by tiling it and surrounding it with single jersey stitches.
-        Raises a KnitpaintCheckException containing a list of problems that occurred. Returns a list of loop if no
+        Raises a KnitpaintCheckException containing a list of problems that occurred. Returns the table of loops if no
         problems occurred
+        :param stop_at: Problem class or tuple of problem classes that stop the check as soon as such a problem occurs
+        :param ignore: Tuple of warning classes that are not checked for
         :return:
         """
-        return check_pattern(self)
+        return check_pattern(self, stop_at=stop_at, ignore=ignore)
 
@@ -1,36 +1,41 @@
 import math
-from typing import List
 import numpy as np
-from .loop import Loop
+from .loop import Loop, LoopTable
 from .virtual_knitting_machine import VirtualKnittingMachine
 from .cable_resolution import resolve_cable_stitches
 from .problems import *
+from .batch import check_many
 
 
-def check(knitpaint) -> List[Loop]:
+def check(knitpaint, stop_at=None, ignore=()) -> LoopTable:
     """
     Checks the provided knitpaint by virtually performing the actual knitting. Raises a KnitpaintCheckException
-    containing a list of problems that occurred. Returns a list of loop if no problems occurred
+    containing a list of problems that occurred. Returns the table of loops if no problems occurred
     :param knitpaint:
+    :param stop_at: Problem class or tuple of problem classes that stop the check as soon as such a problem occurs, e.g.
+    KnitPaintCheckError to stop at the first error or KnitPaintCheckProblem to stop at the first problem
+    :param ignore: Tuple of warning classes that are not checked for
     :return:
     """
-    data = knitpaint.bitmap_data[:]
+    data = knitpaint.get_np_bitmap_data().ravel()
     num_wales = knitpaint.get_width()
 
     # Replace cable stitches with move stitches for further checking
     processed_data = resolve_cable_stitches(data, num_wales)
 
     # Create a virtual knitting machine and make it knit the processed data
-    knitting_machine = VirtualKnittingMachine(num_wales)
+    knitting_machine = VirtualKnittingMachine(num_wales, stop_at=stop_at, ignore=ignore)
     return knitting_machine.run(processed_data, num_wales)
 
 
-def check_pattern(knitpaint) -> List[Loop]:
+def check_pattern(knitpaint, stop_at=None, ignore=()) -> LoopTable:
     """
     Checks if the provided knitpaint can be knitted by tiling it and surrounding it with single jersey stitches.
-    Raises a KnitpaintCheckException containing a list of problems that occurred. Returns a list of loop if no
+    Raises a KnitpaintCheckException containing a list of problems that occurred. Returns the table of loops if no
     problems occurred
     :param knitpaint:
+    :param stop_at: Problem class or tuple of problem classes that stop the check as soon as such a problem occurs
+    :param ignore: Tuple of warning classes that are not checked for
     :return:
     """
     bitmap = knitpaint.get_np_bitmap_data()
@@ -40,4 +45,16 @@ def check_pattern(knitpaint) -> List[Loop]:
     tiled = np.tile(bitmap, (vertical_repetitions, 2))
     padded = np.pad(tiled, ((2, 2), (7, 7)), 'constant', constant_values=((1, 1), (1, 1)))
     from .. import KnitPaint
-    return check(KnitPaint(padded))
+    padded_knitpaint = KnitPaint(padded)
+    num_wales = padded_knitpaint.get_width()
+
+    # Replace cable stitches with move stitches for further checking
+    processed_data = resolve_cable_stitches(padded_knitpaint.get_np_bitmap_data().ravel(), num_wales)
+
+    # Knit the processed data. Repetitions that only repeat the state of the previous repetition are not knitted again.
+    # The carriage has the same direction every other course, so the period is doubled for patterns of uneven height.
+    height = bitmap.shape[0]
+    period = height if height % 2 == 0 else 2 * height
+    knitting_machine = VirtualKnittingMachine(num_wales, stop_at=stop_at, ignore=ignore)
+    return knitting_machine.run_periodic(processed_data, num_wales, start=2, end=2 + vertical_repetitions * height,
+                                         period=period)
@@ -0,0 +1,142 @@
+import os
+import time
+import functools
+import multiprocessing
+from typing import Dict, List
+import numpy as np
+from . import problems
+from .problems import *
+
+# Names of all problems that can be reported by the check. The results contain the number of problems of each class.
+PROBLEM_NAMES = [name for name, value in vars(problems).items() if isinstance(value, type)
+                 and issubclass(value, KnitPaintCheckProblem) and value not in
+                 (KnitPaintCheckProblem, KnitPaintCheckSyntaxError, KnitPaintCheckError, KnitPaintCheckWarning)]
+
+# Columns of the results of a batch check
+RESULT_COLUMNS = ['status', 'message', 'first_problem', 'first_problem_course', 'first_problem_wale'] + \
+                 PROBLEM_NAMES + ['duration']
+
+
+def check_many(patterns, workers=None, mode='pattern', stop_at=None, ignore=(), chunk_size=64,
+               start_method=None, pool=None) -> Dict[str, list]:
+    """
+    Checks many patterns with a pool of worker processes. The bitmaps are sent to the workers in chunks. Returns the
+    results as columns with one row per pattern in the order of the patterns, e.g. to create a pandas.DataFrame. The
+    status is correct, warning, error, syntax_error, not_implemented or failed if the check raised another exception,
+    which is described by the message. Each problem class has a column with the number of its problems.
+    :param patterns: Iterable of KnitPaint objects or bitmaps as numpy arrays
+    :param workers: Number of worker processes, all cores by default. A single worker checks in this process.
+    :param mode: Either pattern to check the patterns with check_pattern or single to check them with check
+    :param stop_at: Problem class or tuple of problem classes that stop the check of a pattern at the first such problem
+    :param ignore: Tuple of warning classes that are not checked for
+    :param chunk_size: Number of patterns sent to a worker at once
+    :param start_method: Start method of the worker processes, the default of the platform by default. Use spawn if the
+    calling process loaded libraries with threads that do not survive a fork, e.g. TensorFlow.
+    :param pool: Optional multiprocessing pool that is used instead of starting a new one, e.g. to reuse its workers for
+    many calls. The number of workers and the start method are ignored if a pool is provided.
+    :return:
+    """
+    if mode not in ('pattern', 'single'):
+        raise ValueError('Unknown check mode ' + str(mode))
+    workers = os.cpu_count() if workers is None else workers
+    chunks = get_chunks(patterns, chunk_size)
+    task = functools.partial(check_chunk, mode=mode, stop_at=stop_at, ignore=tuple(ignore))
+
+    results = {column: [] for column in RESULT_COLUMNS}
+    if pool is not None:
+        add_results(results, pool.imap(task, chunks))
+    elif workers <= 1:
+        add_results(results, map(task, chunks))
+    else:
+        with multiprocessing.get_context(start_method).Pool(workers) as pool:
+            add_results(results, pool.imap(task, chunks))
+    return results
+
+
+def get_chunks(patterns, chunk_size):
+    """
+    Packs the bitmaps of the patterns into chunks of tuples of their shape and bytes
+    :param patterns:
+    :param chunk_size:
+    :return:
+    """
+    chunk = []
+    for pattern in patterns:
+        bitmap = pattern.get_np_bitmap_data() if hasattr(pattern, 'get_np_bitmap_data') else np.asarray(pattern)
+        chunk.append((bitmap.shape, bitmap.astype(np.uint8).tobytes()))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def add_results(results, chunk_results) -> None:
+    """
+    Appends the rows of each chunk to the columns of the results
+    :param results:
+    :param chunk_results:
+    :return:
+    """
+    for rows in chunk_results:
+        for row in rows:
+            for column, value in zip(RESULT_COLUMNS, row):
+                results[column].append(value)
+
+
+def check_chunk(chunk, mode, stop_at, ignore) -> List[tuple]:
+    """
+    Checks the bitmaps of a chunk and returns a row of values of the result columns for each bitmap
+    :param chunk:
+    :param mode:
+    :param stop_at:
+    :param ignore:
+    :return:
+    """
+    rows = []
+    for shape, bitmap_bytes in chunk:
+        bitmap = np.frombuffer(bitmap_bytes, dtype=np.uint8).reshape(shape)
+        row = check_bitmap(bitmap, mode, stop_at, ignore)
+        rows.append(tuple(row[column] for column in RESULT_COLUMNS))
+    return rows
+
+
+def check_bitmap(bitmap, mode='pattern', stop_at=None, ignore=()) -> dict:
+    """
+    Checks a single bitmap and summarizes the problems that occurred
+    :param bitmap:
+    :param mode:
+    :param stop_at:
+    :param ignore:
+    :return:
+    """
+    from .. import KnitPaint
+    from . import check, check_pattern
+    start = time.perf_counter()
+    result = {'status': 'correct', 'message': None, 'first_problem': None, 'first_problem_course': None,
+              'first_problem_wale': None}
+    result.update(dict.fromkeys(PROBLEM_NAMES, 0))
+    try:
+        check_function = check_pattern if mode == 'pattern' else check
+        check_function(KnitPaint(bitmap), stop_at=stop_at, ignore=ignore)
+    except KnitPaintCheckException as e:
+        for problem in e.problems:
+            result[problem.__class__.__name__] += 1
+        if any(isinstance(problem, KnitPaintCheckSyntaxError) for problem in e.problems):
+            result['status'] = 'syntax_error'
+        elif any(isinstance(problem, KnitPaintCheckError) for problem in e.problems):
+            result['status'] = 'error'
+        else:
+            result['status'] = 'warning'
+        first_problem = e.problems[0]
+        result['first_problem'] = first_problem.__class__.__name__
+        result['first_problem_course'] = first_problem.course
+        result['first_problem_wale'] = first_problem.wale
+    except NotImplementedError as e:
+        result['status'] = 'not_implemented'
+        result['message'] = str(e)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['message'] = '{}: {}'.format(e.__class__.__name__, e)
+    result['duration'] = time.perf_counter() - start
+    return result
@@ -1,3 +1,5 @@
+import numpy as np
+
 # Define beds
 NO_BED = None
 FRONT = 0
@@ -103,3 +105,142 @@ COLOR_NUMBERS[96] = ColorNumber(BACK, KNIT, FRONT_TO_BACK, 2, BACK_TO_FRONT, FRO
 COLOR_NUMBERS[97] = ColorNumber(BACK, KNIT, FRONT_TO_BACK, 4, BACK_TO_FRONT, FRONT_TO_BACK, links_process=True)
 COLOR_NUMBERS[116] = ColorNumber(FRONT, MISS, links_process=True)
 COLOR_NUMBERS[117] = ColorNumber(BACK, MISS, links_process=True)
+
+
+# Rackings are performed in this order by the machine
+RACKING_ORDER = [-1, 1, -2, 2, -3, 3, -4, 4, -5, 5, -6, 6, -7, 7]
+RACKING_RANK = np.zeros(15, dtype=np.int8)
+RACKING_RANK[np.array(RACKING_ORDER) + 7] = np.arange(len(RACKING_ORDER))
+
+# Compile the color numbers into parallel arrays, so the attributes of whole courses can be looked up at once instead of
+# dereferencing a ColorNumber object per stitch. Unset values like NO_BED, MISS and NO_TRANSFER are stored as NONE.
+NONE = -1
+
+
+def _compile_color_numbers(attribute, default):
+    """
+    Returns an array with the provided attribute of all color numbers
+    :param attribute:
+    :param default: Value for color numbers that are not implemented
+    :return:
+    """
+    values = [default if color_number is None else getattr(color_number, attribute) for color_number in COLOR_NUMBERS]
+    return np.array([NONE if value is None else value for value in values], dtype=np.int8)
+
+
+COLOR_NUMBER_IMPLEMENTED = np.array([color_number is not None for color_number in COLOR_NUMBERS])
+COLOR_NUMBER_BED = _compile_color_numbers('bed', NO_BED)
+COLOR_NUMBER_OPERATION = _compile_color_numbers('operation', MISS)
+COLOR_NUMBER_TRANSFER_BEFORE_RACKING = _compile_color_numbers('transfer_before_racking', NO_TRANSFER)
+COLOR_NUMBER_RACKING = _compile_color_numbers('racking', 0)
+COLOR_NUMBER_TRANSFER_WHILE_RACKING = _compile_color_numbers('transfer_while_racking', NO_TRANSFER)
+COLOR_NUMBER_TRANSFER_AFTER_RACKING = _compile_color_numbers('transfer_after_racking', NO_TRANSFER)
+COLOR_NUMBER_LINKS_PROCESS = _compile_color_numbers('links_process', False).astype(bool)
+
+
+class DecodedCourse:
+    """
+    Decoded view on the color numbers of a single course. The attributes of all stitches are looked up in the compiled
+    color number arrays and indexed by wale. The wales that take part in each phase of the machine are precomputed in
+    the order of the carriage.
+    """
+
+    def __init__(self, color_indices, carriage_going_right):
+        """
+        Decodes the provided color numbers. Throws an error if a color number occurs that is not implemented. Even
+        courses will go left to right, uneven courses go right to left.
+        :param color_indices:
+        :param carriage_going_right:
+        """
+        self.color_indices = np.asarray(color_indices, dtype=np.intp)
+        self.carriage_order = np.arange(self.color_indices.size)
+        if not carriage_going_right:
+            self.carriage_order = self.carriage_order[::-1]
+
+        implemented = COLOR_NUMBER_IMPLEMENTED[self.color_indices]
+        if not implemented.all():
+            color_index = self.color_indices[self.carriage_order[~implemented[self.carriage_order]][0]]
+            raise NotImplementedError("Color number " + str(color_index) + " is not implemented.")
+
+        self.bed = COLOR_NUMBER_BED[self.color_indices]
+        self.operation = COLOR_NUMBER_OPERATION[self.color_indices]
+        self.transfer_before_racking = COLOR_NUMBER_TRANSFER_BEFORE_RACKING[self.color_indices]
+        self.racking = COLOR_NUMBER_RACKING[self.color_indices]
+        self.transfer_while_racking = COLOR_NUMBER_TRANSFER_WHILE_RACKING[self.color_indices]
+        self.transfer_after_racking = COLOR_NUMBER_TRANSFER_AFTER_RACKING[self.color_indices]
+        self.links_process = COLOR_NUMBER_LINKS_PROCESS[self.color_indices]
+
+    def get_wales(self, mask):
+        """
+        Returns the wales selected by the provided mask in the order of the carriage
+        :param mask: Boolean array indexed by wale
+        :return:
+        """
+        return self.carriage_order[mask[self.carriage_order]]
+
+    def get_operation_wales(self):
+        """
+        Returns the wales that perform an operation in the order of the carriage
+        :return:
+        """
+        return self.get_wales(self.operation != NONE)
+
+    def get_transfer_before_racking_wales(self):
+        """
+        Returns the wales that transfer before racking in the order of the carriage
+        :return:
+        """
+        return self.get_wales(self.transfer_before_racking != NONE)
+
+    def get_racking_wales(self):
+        """
+        Returns the wales that rack in the order of the carriage
+        :return:
+        """
+        return self.get_wales(self.racking != 0)
+
+    def get_racking_groups(self):
+        """
+        Groups the wales that rack by their racking. Returns a list of tuples with the racking and its wales. Only
+        rackings that occur in the course are included in the order of the machine. The wales of each group are in the
+        order of the carriage.
+        :return:
+        """
+        wales = self.get_racking_wales()
+        if wales.size == 0:
+            return []
+        # A stable sort by the position of the racking in the machine order keeps the carriage order within groups
+        rank = RACKING_RANK[self.racking[wales] + 7]
+        order = np.argsort(rank, kind='stable')
+        wales = wales[order]
+        rank = rank[order]
+        group_starts = np.flatnonzero(np.diff(rank)) + 1
+        group_ranks = rank[np.r_[0, group_starts]].tolist()
+        return [(RACKING_ORDER[group_rank], group_wales)
+                for group_rank, group_wales in zip(group_ranks, np.split(wales, group_starts))]
+
+    def get_transfer_after_racking(self, next_color_indices=None):
+        """
+        Returns the transfer after racking of every wale. If the current color number and the color number in the next
+        course both use links process and both operate on different beds, a links transfer is performed instead of the
+        regular transfer. The color number in the next course is read at the wale offset by the racking.
+        :param next_color_indices: Color numbers of the next course or None for the last course
+        :return:
+        """
+        if next_color_indices is None:
+            return self.transfer_after_racking
+
+        next_color_indices = np.asarray(next_color_indices, dtype=np.intp)
+        next_wales = np.arange(self.color_indices.size) + self.racking
+        out_of_range = (next_wales < -next_color_indices.size) | (next_wales >= next_color_indices.size)
+        if out_of_range.any():
+            wale = self.get_wales(out_of_range)[0]
+            raise IndexError("Wale " + str(next_wales[wale]) + " of the next course is out of range")
+
+        # Unimplemented color numbers of the next course are reported when the next course is decoded
+        next_color_indices = next_color_indices[next_wales]
+        next_bed = COLOR_NUMBER_BED[next_color_indices]
+        both_links = self.links_process & COLOR_NUMBER_LINKS_PROCESS[next_color_indices]
+        both_opposite = ((self.bed == FRONT) & (next_bed == BACK)) | ((self.bed == BACK) & (next_bed == FRONT))
+        links_transfer = np.where(self.bed == BACK, BACK_TO_FRONT, FRONT_TO_BACK)
+        return np.where(both_links & both_opposite, links_transfer, self.transfer_after_racking)
@@ -1,26 +1,265 @@
+from array import array
 from typing import List
+import numpy as np
+
+# Value of destination courses, wales and loops of loops that are still held by a needle
+NO_LOOP = -1
+
+
+class LoopTable:
+    """
+    Stores all processed loops in typed arrays with one entry per loop. Loops are identified by their index, which is
+    the order they were created in, so the previous and next loop are the adjacent indices. The source loops of all
+    loops are concatenated into a single array and the source loops of loop i are at src_loop_offsets[i] to
+    src_loop_offsets[i + 1].
+    """
+
+    def __init__(self):
+        self.src_course = array('i')
+        self.src_wale = array('i')
+        self.dst_course = array('i')
+        self.dst_wale = array('i')
+        self.dst_loop = array('i')
+        self.src_loop_offsets = array('i', [0])
+        self.src_loop_indices = array('i')
+
+        # Loop objects are only created when loops are accessed and are reused, so they can be compared by identity
+        self._views = {}
+
+    def __len__(self):
+        return len(self.src_course)
+
+    def __getitem__(self, index):
+        """
+        Returns a Loop object for the loop with the provided index
+        :param index:
+        :return:
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Loop index out of range')
+        view = self._views.get(index)
+        if view is None:
+            view = self._views[index] = Loop(self, index)
+        return view
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, src_course, src_wale, src_loops=()) -> int:
+        """
+        Adds a loop created at the provided course and wale and returns its index. The source loops end in the new loop.
+        :param src_course:
+        :param src_wale:
+        :param src_loops: Indices of the loops that are knitted through the new loop
+        :return:
+        """
+        index = len(self.src_course)
+        self.src_course.append(src_course)
+        self.src_wale.append(src_wale)
+        self.dst_course.append(NO_LOOP)
+        self.dst_wale.append(NO_LOOP)
+        self.dst_loop.append(NO_LOOP)
+        if len(src_loops) > 0:
+            self.src_loop_indices.extend(src_loops)
+            for src_loop in src_loops:
+                self.dst_course[src_loop] = src_course
+                self.dst_wale[src_loop] = src_wale
+                self.dst_loop[src_loop] = index
+        self.src_loop_offsets.append(len(self.src_loop_indices))
+        return index
+
+    def copy(self, number_of_loops=None) -> 'LoopTable':
+        """
+        Returns a copy of the table with the provided number of loops. Loops that end in a loop that was not copied are
+        held by a needle again in the copy.
+        :param number_of_loops: Number of loops from the start of the table, all loops by default
+        :return:
+        """
+        number_of_loops = len(self) if number_of_loops is None else number_of_loops
+        table = LoopTable()
+        table.src_course = self.src_course[:number_of_loops]
+        table.src_wale = self.src_wale[:number_of_loops]
+        table.dst_course = self.dst_course[:number_of_loops]
+        table.dst_wale = self.dst_wale[:number_of_loops]
+        table.dst_loop = self.dst_loop[:number_of_loops]
+        table.src_loop_offsets = self.src_loop_offsets[:number_of_loops + 1]
+        table.src_loop_indices = self.src_loop_indices[:self.src_loop_offsets[number_of_loops]]
+
+        dst_loop = np.frombuffer(table.dst_loop, dtype=np.intc)
+        released = np.flatnonzero(dst_loop >= number_of_loops).tolist()
+        del dst_loop
+        for index in released:
+            table.set_dst(index, NO_LOOP, NO_LOOP, NO_LOOP)
+        return table
+
+    def extend(self, table, start) -> None:
+        """
+        Appends the loops of another table starting at the provided index. The loops of both tables before the index
+        need to have the same number of source loops.
+        :param table:
+        :param start:
+        :return:
+        """
+        self.src_course.extend(table.src_course[start:])
+        self.src_wale.extend(table.src_wale[start:])
+        self.dst_course.extend(table.dst_course[start:])
+        self.dst_wale.extend(table.dst_wale[start:])
+        self.dst_loop.extend(table.dst_loop[start:])
+        self.src_loop_offsets.extend(table.src_loop_offsets[start + 1:])
+        self.src_loop_indices.extend(table.src_loop_indices[table.src_loop_offsets[start]:])
+
+    def append_repetition(self, start, stop, course_offset, held_loops) -> None:
+        """
+        Appends copies of the loops from start to stop that are moved by a number of courses. Source loops before the
+        copied loops are replaced by other loops that continue like them, all other loops by their copies.
+        :param start: Index of the first copied loop
+        :param stop: Index after the last copied loop
+        :param course_offset: Number of courses between the loops and their copies
+        :param held_loops: Dictionary that maps each loop that was held before the copied loops to its replacement
+        :return:
+        """
+        loop_offset = len(self) - start
+        src_offset = self.src_loop_offsets[start]
+
+        # Copies of loops that end after the copied loops are still held by a needle
+        dst_loop = np.array(self.dst_loop[start:stop], dtype=np.intc)
+        copied = (dst_loop != NO_LOOP) & (dst_loop < stop)
+        dst_loop = np.where(copied, dst_loop + loop_offset, NO_LOOP).astype(np.intc)
+        dst_course = np.array(self.dst_course[start:stop], dtype=np.intc) + course_offset
+        dst_course = np.where(copied, dst_course, NO_LOOP).astype(np.intc)
+        dst_wale = np.where(copied, np.array(self.dst_wale[start:stop], dtype=np.intc), NO_LOOP).astype(np.intc)
+
+        src_loop_indices = np.array(self.src_loop_indices[src_offset:self.src_loop_offsets[stop]], dtype=np.intc)
+        held = src_loop_indices < start
+        src_loop_indices[~held] += loop_offset
+        src_loop_indices[held] = [held_loops[loop] for loop in src_loop_indices[held].tolist()]
+        src_loop_offsets = np.array(self.src_loop_offsets[start + 1:stop + 1], dtype=np.intc)
+        src_loop_offsets += len(self.src_loop_indices) - src_offset
+
+        # The replacements of the held loops end in the copies
+        for loop, replacement in held_loops.items():
+            if start <= self.dst_loop[loop] < stop:
+                self.set_dst(replacement, self.dst_course[loop] + course_offset, self.dst_wale[loop],
+                             self.dst_loop[loop] + loop_offset)
+
+        self.src_course.frombytes((np.array(self.src_course[start:stop], dtype=np.intc) + course_offset).tobytes())
+        self.src_wale.extend(self.src_wale[start:stop])
+        self.dst_course.frombytes(dst_course.tobytes())
+        self.dst_wale.frombytes(dst_wale.tobytes())
+        self.dst_loop.frombytes(dst_loop.tobytes())
+        self.src_loop_offsets.frombytes(src_loop_offsets.tobytes())
+        self.src_loop_indices.frombytes(src_loop_indices.tobytes())
+
+    def set_dst(self, index, dst_course, dst_wale, dst_loop) -> None:
+        """
+        Sets where a loop goes to
+        :param index:
+        :param dst_course:
+        :param dst_wale:
+        :param dst_loop:
+        :return:
+        """
+        self.dst_course[index] = dst_course
+        self.dst_wale[index] = dst_wale
+        self.dst_loop[index] = dst_loop
+
+    def get_src_loops(self, index) -> List[int]:
+        """
+        Returns the indices of the source loops of a loop
+        :param index:
+        :return:
+        """
+        return self.src_loop_indices[self.src_loop_offsets[index]:self.src_loop_offsets[index + 1]].tolist()
+
+    def is_pickup_stitch(self, index) -> bool:
+        """
+        Returns true if the loop has no source loops. Loops in the first course should not be considered a pickup
+        stitch
+        :param index:
+        :return:
+        """
+        return self.src_course[index] != 0 and self.src_loop_offsets[index + 1] == self.src_loop_offsets[index]
+
+    def get_continuous_pickup_stitches(self) -> np.ndarray:
+        """
+        Returns the indices of all continuous pickup stitches. A pickup stitch becomes a continuous pickup stitch if
+        adjacent pickup stitches are released adjacent.
+        :return:
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.intp)
+        src_course = np.frombuffer(self.src_course, dtype=np.intc)
+        dst_loop = np.frombuffer(self.dst_loop, dtype=np.intc)
+        number_of_src_loops = np.diff(np.frombuffer(self.src_loop_offsets, dtype=np.intc))
+
+        # A pickup stitch can only be a continuous pickup stitch if it is released and if its destination loop is not
+        # attached to another loop (e. g. caused by a tuck). An adjacent loop only counts under the same conditions.
+        released = (src_course != 0) & (number_of_src_loops == 0) & (dst_loop != NO_LOOP)
+        released[released] = number_of_src_loops[dst_loop[released]] <= 1
+
+        # Check the previous and the next loop in the same course
+        continuous = np.zeros(len(self), dtype=bool)
+        adjacent = released[1:] & released[:-1] & (src_course[1:] == src_course[:-1])
+        adjacent &= np.abs(dst_loop[1:] - dst_loop[:-1]) == 1
+        continuous[1:] |= adjacent
+        continuous[:-1] |= adjacent
+        return np.flatnonzero(continuous)
 
 
 class Loop:
     """
-    a structure for processed loops
+    a view on a single loop of a loop table
     """
-    def __init__(self, src_course, src_wale):
-        self.src_course = src_course
-        self.src_wale = src_wale
-        self.src_loops: List[Loop] = []
-        self.prev_loop: Loop = None
-        self.next_loop: Loop = None
-        self.dst_course = None
-        self.dst_wale = None
-        self.dst_loop: Loop = None
+    def __init__(self, table: LoopTable, index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def src_course(self):
+        return self.table.src_course[self.index]
+
+    @property
+    def src_wale(self):
+        return self.table.src_wale[self.index]
+
+    @property
+    def dst_course(self):
+        dst_course = self.table.dst_course[self.index]
+        return None if dst_course == NO_LOOP else dst_course
+
+    @property
+    def dst_wale(self):
+        dst_wale = self.table.dst_wale[self.index]
+        return None if dst_wale == NO_LOOP else dst_wale
+
+    @property
+    def dst_loop(self):
+        dst_loop = self.table.dst_loop[self.index]
+        return None if dst_loop == NO_LOOP else self.table[dst_loop]
+
+    @property
+    def src_loops(self):
+        return [self.table[src_loop] for src_loop in self.table.get_src_loops(self.index)]
+
+    @property
+    def prev_loop(self):
+        return self.table[self.index - 1] if self.index > 0 else None
+
+    @property
+    def next_loop(self):
+        return self.table[self.index + 1] if self.index + 1 < len(self.table) else None
 
     def is_pickup_stitch(self) -> bool:
         """
         Returns true if the loop has no source loops. oops in the first course should not be considered a pickup stitch
         :return:
         """
-        return self.src_course != 0 and len(self.src_loops) == 0
+        return self.table.is_pickup_stitch(self.index)
 
     def is_continuous_pickup_stitch(self):
         """
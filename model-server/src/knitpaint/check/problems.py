@@ -145,3 +145,23 @@ class TransferOutOfBedError(KnitPaintCheckError):
     left or the right edge of the bed.
     """
     pass
+
+
+# Problems of the same family at the same location are only reported once with the highest severity. The families list
+# their problems from the lowest to the highest severity. Problems that are not listed form a family of their own.
+PROBLEM_FAMILIES = [
+    [NumberOfLoopsInNeedleWarning, NumberOfLoopsInNeedleError],
+    [LoopHoldWarning, LoopHoldError],
+    [RackingWarning, RackingError]
+]
+PROBLEM_SEVERITIES = {problem_class: (family[0], severity)
+                      for family in PROBLEM_FAMILIES for severity, problem_class in enumerate(family)}
+
+
+def get_problem_family_and_severity(problem):
+    """
+    Returns the family of the provided problem and its severity within the family
+    :param problem:
+    :return:
+    """
+    return PROBLEM_SEVERITIES.get(problem.__class__, (problem.__class__, 0))
@@ -0,0 +1,48 @@
+import multiprocessing
+from .make_knitpaint import make_knitpaint
+from ..problems import *
+from .. import check_many
+
+
+def test_check_many():
+    patterns = [make_knitpaint([[1, 1], [1, 1]]),
+                make_knitpaint([[1, 16, 1], [1, 16, 1]]),
+                make_knitpaint([[4, 4, 1]]),
+                make_knitpaint([[1, 13, 1]])]
+    results = check_many(patterns, workers=1)
+    assert results['status'] == ['correct', 'error', 'syntax_error', 'not_implemented']
+    assert results['LoopHoldError'][1] > 0 and results['LoopHoldError'][2] == 0
+    assert results['IncompleteCableError'][2] > 0 and results['IncompleteCableError'][1] == 0
+    assert results['first_problem'][1] == 'LoopHoldError'
+    assert results['first_problem_course'][1] == 9
+    assert results['first_problem_wale'][1] == 8
+    assert results['message'][3] == 'Color number 13 is not implemented.'
+    assert all(duration > 0 for duration in results['duration'])
+
+    results = check_many(patterns, workers=1, mode='single')
+    assert results['status'] == ['correct', 'correct', 'syntax_error', 'not_implemented']
+
+
+def test_check_many_workers():
+    patterns = [make_knitpaint([[1, 16, 1], [1, 16, 1]]), make_knitpaint([[1, 11, 1], [1, 11, 1]]),
+                make_knitpaint([[4, 4, 1]])] * 5
+    results = check_many(patterns, workers=2, chunk_size=2, stop_at=KnitPaintCheckError)
+    expected = check_many(patterns, workers=1, stop_at=KnitPaintCheckError)
+    assert results['status'] == ['error', 'error', 'syntax_error'] * 5
+    del results['duration'], expected['duration']
+    assert results == expected
+
+
+def test_check_many_spawned_workers():
+    patterns = [make_knitpaint([[1, 16, 1], [1, 16, 1]]), make_knitpaint([[1, 1], [1, 1]])] * 2
+    results = check_many(patterns, workers=2, chunk_size=1, start_method='spawn')
+    assert results['status'] == ['error', 'correct'] * 2
+
+
+def test_check_many_shared_pool():
+    patterns = [make_knitpaint([[1, 16, 1], [1, 16, 1]]), make_knitpaint([[1, 1], [1, 1]])]
+    with multiprocessing.Pool(2) as pool:
+        first = check_many(patterns, chunk_size=1, pool=pool)
+        second = check_many(patterns[::-1], chunk_size=1, pool=pool)
+    assert first['status'] == ['error', 'correct']
+    assert second['status'] == ['correct', 'error']
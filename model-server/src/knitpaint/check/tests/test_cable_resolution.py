@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from ..cable_resolution import resolve_cable_stitches
 from ..problems import KnitPaintCheckException
 
@@ -172,3 +173,19 @@ def test_long_cable_stitches():
     assert len(problems) == 1
     assert problems[0].course == 0
     assert problems[0].wale == 1
+
+
+def test_resolve_cable_stitches_of_array():
+    """
+    Arrays should be resolved like lists and only courses with cable stitches should change
+    """
+    in_data = np.array([1, 4, 5, 1,
+                        1, 2, 1, 2,
+                        15, 15, 14, 1], dtype=np.uint8)
+    ex_data = [1, 71, 61, 1,
+               1, 2, 1, 2,
+               71, 71, 62, 1]
+    res = resolve_cable_stitches(in_data, 4)
+    assert isinstance(res, np.ndarray)
+    assert res.tolist() == ex_data
+    assert resolve_cable_stitches(in_data.tolist(), 4) == ex_data
@@ -0,0 +1,41 @@
+import pytest
+from ..color_numbers import *
+
+
+def test_compiled_color_numbers():
+    for color_index, color_number in enumerate(COLOR_NUMBERS):
+        assert COLOR_NUMBER_IMPLEMENTED[color_index] == (color_number is not None)
+        if color_number is None:
+            continue
+        assert COLOR_NUMBER_BED[color_index] == (NONE if color_number.bed is NO_BED else color_number.bed)
+        operation = NONE if color_number.operation is MISS else color_number.operation
+        assert COLOR_NUMBER_OPERATION[color_index] == operation
+        assert COLOR_NUMBER_RACKING[color_index] == color_number.racking
+        assert COLOR_NUMBER_LINKS_PROCESS[color_index] == color_number.links_process
+
+
+def test_decoded_course_order():
+    course = DecodedCourse([1, 0, 7, 11], carriage_going_right=True)
+    assert course.get_operation_wales().tolist() == [0, 2, 3]
+    assert course.get_racking_wales().tolist() == [2]
+
+    course = DecodedCourse([1, 0, 7, 11], carriage_going_right=False)
+    assert course.get_operation_wales().tolist() == [3, 2, 0]
+
+
+def test_racking_groups():
+    course = DecodedCourse([62, 7, 1, 6, 72, 62, 0], carriage_going_right=False)
+    groups = [(racking, wales.tolist()) for racking, wales in course.get_racking_groups()]
+    assert groups == [(-1, [3]), (1, [1]), (-2, [5, 0]), (2, [4])]
+    assert DecodedCourse([1, 2, 1], carriage_going_right=True).get_racking_groups() == []
+
+
+def test_decoded_course_not_implemented():
+    with pytest.raises(NotImplementedError, match='Color number 13'):
+        DecodedCourse([1, 3, 13], carriage_going_right=False)
+
+
+def test_decoded_course_links_transfer():
+    course = DecodedCourse([1, 2, 1], carriage_going_right=True)
+    transfer = course.get_transfer_after_racking([2, 2, 51])
+    assert transfer.tolist() == [FRONT_TO_BACK, NONE, NONE]
@@ -1,5 +1,6 @@
+import pytest
 from .make_knitpaint import make_knitpaint
-from .. import check
+from .. import check, KnitPaintCheckException
 
 
 def assert_from_to(loops, src_course, src_wale, dst_course, dst_wale):
@@ -229,3 +230,26 @@ def test_cables():
     assert_from_to(loops, 0, 3, 1, 1)
     assert_from_to(loops, 0, 4, 1, 2)
     assert_from_to(loops, 0, 5, 1, 5)
+
+
+def test_loop_table():
+    input_pattern = make_knitpaint([[1, 1, 1],
+                                    [1, 1, 1]])
+    loops = check(input_pattern)
+    assert loops[-1] is loops[5]
+    assert loops[1:3] == [loops[1], loops[2]]
+    assert [loop.src_course for loop in loops] == list(loops.src_course)
+    assert loops[5].dst_loop is None
+    assert loops.get_src_loops(3) == [2]
+
+
+def test_continuous_pickup_stitches_of_loop_table():
+    input_pattern = make_knitpaint([[1, 1, 1, 1],
+                                    [1, 1, 1, 1],
+                                    [1, 6, 7, 1]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern)
+    loops = err.value.loops
+    expected = [loop.index for loop in loops if loop.is_continuous_pickup_stitch()]
+    assert len(expected) > 0
+    assert loops.get_continuous_pickup_stitches().tolist() == expected
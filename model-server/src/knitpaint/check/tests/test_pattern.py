@@ -1,7 +1,8 @@
 import pytest
+import numpy as np
 from .make_knitpaint import make_knitpaint
 from ..problems import *
-from ... import check_pattern
+from ... import KnitPaint, check, check_pattern
 
 
 def test_correct():
@@ -21,3 +22,29 @@ def test_incorrect_miss():
     problems = err.value.problems
     assert len(problems) > 0
     assert isinstance(problems[0], LoopHoldError)
+
+
+@pytest.mark.parametrize('input_list', [
+    [[1, 1], [1, 1]],
+    [[1, 16, 1], [1, 16, 1]],
+    [[1, 11, 1, 2], [1, 1, 2, 1]],
+    [[2, 1, 1], [1, 7, 1], [1, 1, 1]],
+    [[1, 1, 1, 1]] * 6 + [[1, 6, 1, 1]],
+])
+def test_repetitions_are_not_knitted_again(input_list):
+    input_pattern = make_knitpaint(input_list)
+    bitmap = input_pattern.get_np_bitmap_data()
+    vertical_repetitions = max(2, -(-10 // bitmap.shape[0]))
+    padded = np.pad(np.tile(bitmap, (vertical_repetitions, 2)), ((2, 2), (7, 7)), 'constant', constant_values=1)
+
+    # The result needs to be the same as knitting all repetitions
+    results = []
+    for check_function, knitpaint in [(check_pattern, input_pattern), (check, KnitPaint(padded))]:
+        try:
+            loops = check_function(knitpaint)
+            problems = []
+        except KnitPaintCheckException as e:
+            loops = e.loops
+            problems = [(type(p), p.course, p.wale) for p in e.problems]
+        results.append((problems, [(l.src_course, l.src_wale, l.dst_course, l.dst_wale) for l in loops]))
+    assert results[0] == results[1]
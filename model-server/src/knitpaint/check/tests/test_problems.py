@@ -77,6 +77,21 @@ def test_loops_in_needle_error_combined():
     assert problems[1].wale == 1
 
 
+def test_loops_in_needle_warn_while_held():
+    input_pattern = make_knitpaint([[1, 1,  1],
+                                    [1, 16, 1],
+                                    [1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 1,  1]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern)
+    problems = err.value.problems
+    assert len(problems) == 2
+    assert all(isinstance(problem, NumberOfLoopsInNeedleWarning) for problem in problems)
+    assert [problem.course for problem in problems] == [2, 3]
+    assert all(problem.wale == 1 for problem in problems)
+
+
 def test_hold_error_by_miss():
     input_pattern = make_knitpaint([[1, 1,  1],
                                     *[[1, 16, 1]] * 7,
@@ -105,6 +120,18 @@ def test_hold_error_missing_links_process():
     assert problems[0].wale == 1
 
 
+def test_hold_error_after_move():
+    input_pattern = make_knitpaint([*[[1, 1, 16, 1]] * 9,
+                                    [1, 7, 16, 1]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern)
+    problems = err.value.problems
+    assert len(problems) == 2
+    assert all(isinstance(problem, LoopHoldError) for problem in problems)
+    assert [problem.course for problem in problems] == [8, 9]
+    assert all(problem.wale == 2 for problem in problems)
+
+
 def test_max_rack_warn_by_move():
     input_pattern = make_knitpaint([[1, 73, 1, 62, 1]])
     with pytest.raises(KnitPaintCheckException) as err:
@@ -329,3 +356,55 @@ def test_transfer_of_overlapped_loops_2():
     problems = err.value.problems
     assert len(problems) > 0
     assert len([problem for problem in problems if isinstance(problem, TransferWithOverlappedLoopsError)]) > 0
+
+
+def test_problem_families():
+    warning_family, warning_severity = get_problem_family_and_severity(LoopHoldWarning(1, 2))
+    error_family, error_severity = get_problem_family_and_severity(LoopHoldError(1, 2))
+    assert warning_family is error_family
+    assert error_severity > warning_severity
+    assert get_problem_family_and_severity(TransferOutOfBedError(1, 2))[0] is TransferOutOfBedError
+
+
+def test_stop_at_first_problem():
+    input_pattern = make_knitpaint([[1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 1,  1]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern, stop_at=KnitPaintCheckProblem)
+    problems = err.value.problems
+    assert len(problems) == 1
+    assert isinstance(problems[0], NumberOfLoopsInNeedleWarning)
+    assert problems[0].course == 2
+
+
+def test_stop_at_first_error():
+    input_pattern = make_knitpaint([[1, 11, 1, 1],
+                                    [1, 11, 1, 1],
+                                    [1, 11, 1, 1],
+                                    [1, 1,  1, 1],
+                                    [1, 1,  1, 7]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern, stop_at=KnitPaintCheckError)
+    problems = err.value.problems
+    assert isinstance(problems[-1], KnitPaintCheckError)
+    assert all(problem.course <= 3 for problem in problems)
+
+
+def test_ignore_warnings():
+    input_pattern = make_knitpaint([[1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 1,  1]])
+    with pytest.raises(KnitPaintCheckException) as err:
+        check(input_pattern, ignore=(NumberOfLoopsInNeedleWarning,))
+    problems = err.value.problems
+    assert len(problems) == 1
+    assert isinstance(problems[0], NumberOfLoopsInNeedleError)
+
+    input_pattern = make_knitpaint([[1, 11, 1],
+                                    [1, 11, 1],
+                                    [1, 1,  1]])
+    loops = check(input_pattern, ignore=(NumberOfLoopsInNeedleWarning,))
+    assert len(loops) > 0
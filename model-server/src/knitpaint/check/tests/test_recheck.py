@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+from ..problems import *
+from ..virtual_knitting_machine import VirtualKnittingMachine
+
+
+def run(machine, method, *args):
+    """
+    Helper method to run or recheck data and return the problems and where the loops come from
+    :param machine:
+    :param method:
+    :param args:
+    :return:
+    """
+    try:
+        loops = getattr(machine, method)(*args)
+        problems = []
+    except KnitPaintCheckException as e:
+        loops = e.loops
+        problems = [(type(p), p.course, p.wale) for p in e.problems]
+    return problems, [(loop.src_course, loop.src_wale, loop.dst_course, loop.dst_wale) for loop in loops]
+
+
+def make_data(num_courses, edits=()):
+    data = np.tile([[1, 1, 2, 2, 1, 16, 1, 1], [1, 1, 2, 2, 1, 1, 1, 11]], (num_courses // 2, 1))
+    for course, wale, color_number in edits:
+        data[course, wale] = color_number
+    return data.flatten()
+
+
+@pytest.mark.parametrize('edits', [
+    [(15, 2, 1)],
+    [(15, 2, 1), (16, 2, 1), (17, 2, 1)],
+    [(3, 6, 0), (4, 6, 0), (5, 6, 0), (6, 6, 0)],
+    [(38, 0, 7)],
+])
+def test_recheck_equals_run(edits):
+    machine = VirtualKnittingMachine(8, snapshot_interval=4)
+    run(machine, 'run', make_data(40), 8)
+    from_course = min(course for course, _, _ in edits)
+    assert run(machine, 'recheck', from_course, make_data(40, edits)) == \
+        run(VirtualKnittingMachine(8), 'run', make_data(40, edits), 8)
+
+
+def test_recheck_converges():
+    machine = VirtualKnittingMachine(8, snapshot_interval=4)
+    run(machine, 'run', make_data(40), 8)
+
+    # Count the courses that are run again
+    run_courses = []
+    run_course = machine.run_course
+    machine.run_course = lambda: run_courses.append(machine.course) or run_course()
+    machine.recheck(15, make_data(40, [(15, 2, 1)]))
+    assert run_courses[0] == 12
+    assert len(run_courses) < 40 - 12
+    assert machine.course == 40
+    assert max(machine.snapshots) == 40
+
+
+def test_recheck_changed_length():
+    machine = VirtualKnittingMachine(8, snapshot_interval=4)
+    run(machine, 'run', make_data(40), 8)
+    assert run(machine, 'recheck', 30, make_data(30)) == run(VirtualKnittingMachine(8), 'run', make_data(30), 8)
+    assert run(machine, 'recheck', 30, make_data(40)) == run(VirtualKnittingMachine(8), 'run', make_data(40), 8)
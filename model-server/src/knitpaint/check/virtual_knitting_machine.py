@@ -1,129 +1,285 @@
-from typing import List, Generator
-from .loop import Loop
+import copy
+import math
+import heapq
+from typing import List, Set, Tuple, Dict
+import numpy as np
+from .loop import LoopTable
 from .color_numbers import *
 from .problems import *
 
 
+class MachineSnapshot:
+    """
+    The state of a virtual knitting machine at the start of a course. Loops and problems are only stored by their
+    number, since the machine only appends to them.
+    """
+
+    def __init__(self, machine: 'VirtualKnittingMachine'):
+        self.course = machine.course
+        self.number_of_loops = len(machine.all_loops)
+        self.number_of_problems = len(machine.problems)
+        self.bed_loops = [[list(needle_loops) for needle_loops in bed] for bed in machine.bed_loops]
+
+
 class VirtualKnittingMachine:
     """
     This class processes knitpaint data and tracks where loops come from and where they go by virtually performing
     the knitting of a machine. It allows to find problems during the knit.
     """
 
-    def __init__(self, needle_count):
+    def __init__(self, needle_count, stop_at=None, ignore=(), snapshot_interval=None):
         """
         Initializes the virtual knitting machine with a number of virtual needles. Processed patterns can not be wider
         than this number
         :param needle_count:
+        :param stop_at: Problem class or tuple of problem classes that stop the run as soon as such a problem occurs
+        :param ignore: Tuple of problem classes that are not checked for
+        :param snapshot_interval: Number of courses between snapshots of the state that a recheck can resume from. Only
+        the first course is stored by default.
         """
-        # Initialize an empty list for all loops
-        self.all_loops: List[Loop] = []
+        # Initialize an empty table for all loops
+        self.all_loops = LoopTable()
 
-        # Initialize an empty list that tracks the loops on each needle on the front and back bed
-        self.bed_loops: List[List[List[Loop]]] = [[], []]
+        # Initialize an empty list that tracks the indices of the loops on each needle on the front and back bed
+        self.bed_loops: List[List[List[int]]] = [[], []]
         for _ in range(needle_count):
             self.bed_loops[FRONT].append([])
             self.bed_loops[BACK].append([])
 
-        # Keep track of the last knitted loop
-        self.last_loop: Loop = None
+        # Keep track of the needles whose number of loops increased since the last check and of the needles that held
+        # enough loops to cause a problem at the last check. Both contain tuples of bed and needle. Knitting does not
+        # mark a needle as changed, since it leaves a single loop on the needle.
+        self.changed_needles: Set[Tuple[int, int]] = set()
+        self.full_needles: Set[Tuple[int, int]] = set()
+
+        # Keep track of the oldest course the loops on each needle come from, infinite for empty needles. The heap
+        # contains tuples of course, bed and needle. Entries can be outdated, but each needle that holds loops has an
+        # entry with a course that is not newer than its oldest loop.
+        self.oldest_src_courses: List[List[float]] = [[math.inf] * needle_count, [math.inf] * needle_count]
+        self.oldest_src_course_heap: List[Tuple[float, int, int]] = []
 
         # Set current course, wale and racking to default
         self.course = 0
         self.wale = 0
         self.racking = 0
 
-        # Initialize empty list of problems
-        self.problems: List[KnitPaintCheckProblem] = []
+        # Set the problems that stop the run and the problems that are ignored
+        self.stop_at = stop_at
+        self.ignore = tuple(ignore)
 
-    def run(self, data, num_wales) -> List[Loop]:
+        # Initialize empty list of problems. The problems are also registered by their location, mapping the family of
+        # each problem at the location to its index in the list.
+        self.problems: List[KnitPaintCheckProblem] = []
+        self.problem_locations: Dict[Tuple[int, int], Dict[type, int]] = {}
+
+        # Keep the data of the last run and snapshots of its state by course, so edited data can be rechecked
+        self.data = None
+        self.num_wales = needle_count
+        self.courses_data = []
+        self.snapshot_interval = snapshot_interval
+        self.snapshots: Dict[int, MachineSnapshot] = {}
+        self.run_complete = False
+        self.number_of_run_problems = 0
+
+    def run(self, data, num_wales) -> LoopTable:
         """
         Runs the provided knitting data, creates loops and tracks where they start and where they go. If no problems
-        occur, a list of loops is returned, otherwise a KnitpaintCheckException is raised, containing a list of problems
+        occur, the table of loops is returned, otherwise a KnitpaintCheckException is raised, containing a list of
+        problems
         :param data:
         :param num_wales:
         :return:
         """
-        # Split the data into courses
-        courses_data = [data[i: i + num_wales] for i in range(0, len(data), num_wales)]
-
-        # Iterate over all courses
-        for data_course, data_course_color_numbers in enumerate(courses_data):
+        self.set_data(data, num_wales)
+        self.run_courses()
+        return self.finish_run()
 
-            # Check if the increase of the course causes distance problems
-            self.check_distance_of_loops()
-
-            # Perform operations
-            for color_number in self.iterate_course(data_course_color_numbers):
-                if color_number.operation is KNIT:
-                    self.knit(color_number.bed)
-                elif color_number.operation is TUCK:
-                    self.tuck(color_number.bed)
-                elif color_number.operation is SPLIT:
-                    self.split(color_number.bed)
+    def recheck(self, from_course, new_data) -> LoopTable:
+        """
+        Runs an edited version of the data of the last run. The machine resumes from the last snapshot before the edit
+        instead of starting from the first course. If the loops on the needles are the same as in the last run at a
+        snapshot after the edit, the remaining courses of the last run are reused. Returns the table of loops or raises
+        a KnitpaintCheckException just like a new run of the edited data.
+        :param from_course: First course that was edited. Courses before are also run again if their data changed.
+        :param new_data: All data of the edited pattern with the same number of wales as the last run
+        :return:
+        """
+        new_data = np.asarray(new_data)
+        previous_data = self.data
+        if previous_data is None:
+            raise ValueError('The machine has to be run before it can recheck')
+
+        # Find the first and the last course whose data changed. If the number of courses changed, the last run can
+        # not be reused after the edit.
+        common_length = min(len(new_data), len(previous_data))
+        changed = np.flatnonzero(new_data[:common_length] != previous_data[:common_length]) // self.num_wales
+        first_changed_course = min([from_course] + changed[:1].tolist())
+        if len(new_data) == len(previous_data):
+            last_changed_course = max([from_course - 1] + changed[-1:].tolist())
+        else:
+            first_changed_course = min(first_changed_course, common_length // self.num_wales)
+            last_changed_course = math.inf
+
+        # Keep the last run and resume from the last snapshot before the first changed course. The transfers of a
+        # course depend on the data of the next course, so the snapshot of the first changed course can not be used.
+        previous = copy.copy(self)
+        resume_course = max(course for course in previous.snapshots if course == 0 or course < first_changed_course)
+        self.set_data(new_data, self.num_wales)
+        self.restore_snapshot(previous, previous.snapshots[resume_course])
+        self.run_courses(previous, last_changed_course)
+        return self.finish_run()
+
+    def run_periodic(self, data, num_wales, start, end, period) -> LoopTable:
+        """
+        Runs knitting data whose courses repeat with the provided period from the start course up to the end course.
+        Once the loops on the needles at the start of a period are the same as at the start of the previous period
+        relative to the course, the following periods would only repeat the previous period. Their loops and problems
+        are copied from the previous period instead of being knitted. The last course of the repetitions is always
+        knitted, since it depends on the following course. Returns the same result as run.
+        :param data:
+        :param num_wales:
+        :param start: First course of the repetitions. Loops of the first course are not pickup stitches, so the first
+        course can not be repeated.
+        :param end: Course after the last repetition
+        :param period: Number of courses after which the data repeats. It needs to be even, since the direction of the
+        carriage alternates.
+        :return:
+        """
+        if start < 1 or period % 2 != 0:
+            raise ValueError('Repetitions need to start after the first course and need an even period')
+        self.set_data(data, num_wales)
+
+        # Keep snapshots of the start of each period and of the course the last copied period ends at
+        last_copied_course = end - 1
+        last_copied_offset = (last_copied_course - start) % period
+
+        self.run_complete = False
+        while self.course < len(self.courses_data):
+            offset = (self.course - start) % period
+            if self.course >= start and (offset == 0 or offset == last_copied_offset):
+                self.snapshots[self.course] = MachineSnapshot(self)
+            if self.course - period >= start and offset == 0 and self.course < last_copied_course and \
+                    self.has_periodic_state(self.snapshots[self.course - period]):
+                self.copy_periods(self.snapshots[self.course - period], self.snapshots[self.course],
+                                  last_copied_course)
+                continue
+            self.run_course()
+            self.course += 1
+        self.run_complete = True
+        return self.finish_run()
 
-            # Check if the operations caused problems
-            self.check_number_of_loops_in_needles()
+    def set_data(self, data, num_wales) -> None:
+        """
+        Sets the data to run and splits it into courses
+        :param data:
+        :param num_wales:
+        :return:
+        """
+        self.data = np.asarray(data)
+        self.num_wales = num_wales
+        self.courses_data = [self.data[i: i + num_wales] for i in range(0, len(self.data), num_wales)]
 
-            # Perform transfer before racking operations
-            for color_number in self.iterate_course(data_course_color_numbers):
-                self.transfer(color_number.transfer_before_racking)
+    def run_courses(self, previous=None, last_changed_course=math.inf) -> None:
+        """
+        Runs the courses from the current course to the end and takes snapshots. If the state of a previous run is
+        provided, its remaining courses are reused as soon as the state converges after the last changed course.
+        :param previous: Machine with the state of the previous run
+        :param last_changed_course: Last course whose data differs from the previous run
+        :return:
+        """
+        self.run_complete = False
+        while True:
+            if self.course == 0 or (self.snapshot_interval and self.course % self.snapshot_interval == 0):
+                self.snapshots[self.course] = MachineSnapshot(self)
+                previous_snapshot = None if previous is None else previous.snapshots.get(self.course)
+                if previous_snapshot is not None and previous.run_complete and self.course > last_changed_course and \
+                        self.has_converged(previous, previous_snapshot):
+                    self.continue_previous_run(previous, previous_snapshot)
+                    return
+            if self.course >= len(self.courses_data):
+                break
+            self.run_course()
+            self.course += 1
+        self.run_complete = True
 
+    def run_course(self) -> None:
+        """
+        Runs the current course
+        :return:
+        """
+        # Check if the increase of the course causes distance problems
+        self.check_distance_of_loops()
+
+        # Look up the color numbers. Even courses will go left to right, uneven courses go right to left
+        course = DecodedCourse(self.courses_data[self.course], carriage_going_right=self.course % 2 == 0)
+
+        # Perform operations
+        wales = course.get_operation_wales()
+        for self.wale, operation, bed in zip(wales.tolist(), course.operation[wales].tolist(),
+                                             course.bed[wales].tolist()):
+            if operation == KNIT:
+                self.knit(bed)
+            elif operation == TUCK:
+                self.tuck(bed)
+            elif operation == SPLIT:
+                self.split(bed)
+
+        # Check if the operations caused problems
+        self.check_number_of_loops_in_needles()
+
+        # Perform transfer before racking operations
+        wales = course.get_transfer_before_racking_wales()
+        for self.wale, from_to in zip(wales.tolist(), course.transfer_before_racking[wales].tolist()):
+            self.transfer(from_to)
+
+        # Check if the transfer caused problems
+        self.check_number_of_loops_in_needles()
+
+        # Perform racking operations in the same order as the machine. Only rackings that occur in the course are
+        # performed, the others could not change the loops in the needles.
+        min_racking = 0
+        max_racking = 0
+        for self.racking, wales in course.get_racking_groups():
+            for self.wale, from_to in zip(wales.tolist(), course.transfer_while_racking[wales].tolist()):
+                self.transfer(from_to)
+
+                min_racking = self.racking if self.racking < min_racking else min_racking
+                max_racking = self.racking if self.racking > max_racking else max_racking
+
+                if max_racking - min_racking >= MAX_RACKING_WARN_THRESH:
+                    self.create_problem(RackingWarning(self.course, self.wale))
+
+                if max_racking - min_racking >= MAX_RACKING_ERR_THRESH:
+                    self.create_problem(RackingError(self.course, self.wale))
             # Check if the transfer caused problems
             self.check_number_of_loops_in_needles()
 
-            # Perform racking operations in the same order as the machine
-            min_racking = 0
-            max_racking = 0
-            for self.racking in [-1, 1, -2, 2, -3, 3, -4, 4, -5, 5, -6, 6, -7, 7]:
-                for color_number in self.iterate_course(data_course_color_numbers):
-                    if color_number.racking == self.racking:
-                        self.transfer(color_number.transfer_while_racking)
-
-                        min_racking = self.racking if self.racking < min_racking else min_racking
-                        max_racking = self.racking if self.racking > max_racking else max_racking
-
-                        if max_racking - min_racking >= MAX_RACKING_WARN_THRESH:
-                            self.create_problem(RackingWarning(self.course, self.wale))
-
-                        if max_racking - min_racking >= MAX_RACKING_ERR_THRESH:
-                            self.create_problem(RackingError(self.course, self.wale))
-                # Check if the transfer caused problems
-                self.check_number_of_loops_in_needles()
-
-            # Reset racking
-            self.racking = 0
-
-            # Perform transfer after racking operations. If the loop was racked before it needs to be offset.
-            for color_number in self.iterate_course(data_course_color_numbers):
-                offset = color_number.racking
-                offset_wale = self.wale + offset
-
-                # If the current color number and the color number in the next course both use links process and both
-                # operate on different beds, a links transfer should be performed instead of a regular transfer
-                perform_links = False
-                if len(courses_data) > self.course + 1:
-                    next_course_data = courses_data[self.course + 1]
-                    next_color_number = COLOR_NUMBERS[next_course_data[offset_wale]]
-                    both_links = color_number.links_process and next_color_number.links_process
-                    both_opposite = (color_number.bed == FRONT and next_color_number.bed == BACK) or \
-                                    (color_number.bed == BACK and next_color_number.bed == FRONT)
-                    if both_links and both_opposite:
-                        perform_links = True
-
-                if perform_links:
-                    self.transfer(BACK_TO_FRONT if color_number.bed is BACK else FRONT_TO_BACK, offset)
-                else:
-                    self.transfer(color_number.transfer_after_racking, offset)
+        # Reset racking
+        self.racking = 0
 
-            # Check if the transfer caused problems
-            self.check_number_of_loops_in_needles()
+        # Perform transfer after racking operations. If the loop was racked before it needs to be offset. The next
+        # course decides if a links transfer is performed instead of the regular transfer.
+        next_course_data = self.courses_data[self.course + 1] if len(self.courses_data) > self.course + 1 else None
+        transfer_after_racking = course.get_transfer_after_racking(next_course_data)
+        wales = course.get_wales(transfer_after_racking != NONE)
+        for self.wale, from_to, offset in zip(wales.tolist(), transfer_after_racking[wales].tolist(),
+                                              course.racking[wales].tolist()):
+            self.transfer(from_to, offset)
 
-            # Increase the course
-            self.course += 1
+        # Check if the transfer caused problems
+        self.check_number_of_loops_in_needles()
+
+    def finish_run(self) -> LoopTable:
+        """
+        Checks the loops of the complete run and raises a KnitpaintCheckException if problems occurred
+        :return:
+        """
+        # Remember the problems of the courses, the loops are checked again after a recheck
+        self.number_of_run_problems = len(self.problems)
 
         # Check for continuous pickup stitches
-        self.check_for_continuous_pickup_stitches()
+        if not issubclass(ContinuousPickupStitchWarning, self.ignore):
+            self.check_for_continuous_pickup_stitches()
 
         # Raise exception of problems occurred
         if len(self.problems) > 0:
@@ -131,35 +287,158 @@ class VirtualKnittingMachine:
 
         return self.all_loops
 
-    def iterate_course(self, color_numbers) -> Generator[ColorNumber, None, None]:
+    def restore_snapshot(self, previous, snapshot) -> None:
         """
-        Iterates over the provided color numbers and sets the current wale accordingly. Throws an error if a color
-        number occurs that is not implemented. Even courses will go left to right, uneven courses go right to left.
-        :param color_numbers:
+        Restores the state of a previous run at a snapshot
+        :param previous: Machine with the state of the previous run
+        :param snapshot:
         :return:
         """
-        carriage_going_right = self.course % 2 == 0
-        wales = range(len(color_numbers))
-        wales = wales if carriage_going_right else reversed(wales)
-        for self.wale in wales:
-            color_index = color_numbers[self.wale]
-            color_number = COLOR_NUMBERS[color_index]
-            if color_number is None:
-                raise NotImplementedError("Color number " + str(color_index) + " is not implemented.")
-            yield color_number
+        self.course = snapshot.course
+        self.wale = 0
+        self.racking = 0
+        self.all_loops = previous.all_loops.copy(snapshot.number_of_loops)
+        self.bed_loops = [[list(needle_loops) for needle_loops in bed] for bed in snapshot.bed_loops]
+        self.problems = previous.problems[:snapshot.number_of_problems]
+        self.snapshots = {course: s for course, s in previous.snapshots.items() if course <= snapshot.course}
+        self.reset_tracking()
 
-    def create_loop(self) -> Loop:
+    def has_converged(self, previous, snapshot) -> bool:
         """
-        Creates a loop at the current course and wale, adds it to the list of all loops and returns it
+        Checks if the current state equals the state of a previous run at a snapshot of the same course. The loops on
+        the needles have to be the same and need to come from the same locations.
+        :param previous: Machine with the state of the previous run
+        :param snapshot:
         :return:
         """
-        loop = Loop(self.course, self.wale)
-        if self.last_loop is not None:
-            loop.prev_loop = self.last_loop
-            self.last_loop.next_loop = loop
-        self.last_loop = loop
-        self.all_loops.append(loop)
-        return loop
+        previous_loops = previous.all_loops
+        if len(self.all_loops) != snapshot.number_of_loops or self.bed_loops != snapshot.bed_loops:
+            return False
+        if len(self.all_loops.src_loop_indices) != previous_loops.src_loop_offsets[snapshot.number_of_loops]:
+            return False
+        for bed in self.bed_loops:
+            for needle_loops in bed:
+                for loop in needle_loops:
+                    if self.all_loops.src_course[loop] != previous_loops.src_course[loop] or \
+                            self.all_loops.src_wale[loop] != previous_loops.src_wale[loop] or \
+                            self.all_loops.is_pickup_stitch(loop) != previous_loops.is_pickup_stitch(loop):
+                        return False
+        return True
+
+    def continue_previous_run(self, previous, snapshot) -> None:
+        """
+        Appends the remaining courses of a previous run after the current state converged with its snapshot
+        :param previous: Machine with the state of the previous run
+        :param snapshot:
+        :return:
+        """
+        # Append the newer loops and restore where the loops that are held at the snapshot went
+        held_loops = [loop for bed in self.bed_loops for needle_loops in bed for loop in needle_loops]
+        self.all_loops.extend(previous.all_loops, snapshot.number_of_loops)
+        for loop in held_loops:
+            self.all_loops.set_dst(loop, previous.all_loops.dst_course[loop], previous.all_loops.dst_wale[loop],
+                                   previous.all_loops.dst_loop[loop])
+
+        # Take over the problems of the remaining courses, the final state and the later snapshots. The snapshots need
+        # to count the problems before the current course of this run.
+        problem_offset = len(self.problems) - snapshot.number_of_problems
+        self.problems += previous.problems[snapshot.number_of_problems:previous.number_of_run_problems]
+        self.bed_loops = [[list(needle_loops) for needle_loops in bed] for bed in previous.bed_loops]
+        for course, previous_snapshot in previous.snapshots.items():
+            if course > self.course:
+                self.snapshots[course] = copy.copy(previous_snapshot)
+                self.snapshots[course].number_of_problems += problem_offset
+        self.course = previous.course
+        self.reset_tracking()
+        self.run_complete = True
+
+    def has_periodic_state(self, snapshot) -> bool:
+        """
+        Checks if the loops on the needles are the same as at a snapshot of a previous course. The loops need to come
+        from the same wales and from the same courses relative to the current course.
+        :param snapshot:
+        :return:
+        """
+        course_offset = self.course - snapshot.course
+        for bed, snapshot_bed in zip(self.bed_loops, snapshot.bed_loops):
+            for needle_loops, snapshot_needle_loops in zip(bed, snapshot_bed):
+                if len(needle_loops) != len(snapshot_needle_loops):
+                    return False
+                for loop, snapshot_loop in zip(needle_loops, snapshot_needle_loops):
+                    if self.all_loops.src_course[loop] - course_offset != self.all_loops.src_course[snapshot_loop] or \
+                            self.all_loops.src_wale[loop] != self.all_loops.src_wale[snapshot_loop] or \
+                            self.all_loops.is_pickup_stitch(loop) != self.all_loops.is_pickup_stitch(snapshot_loop):
+                        return False
+        return True
+
+    def copy_periods(self, period_start, period_end, last_course) -> None:
+        """
+        Repeats the knitted period between two snapshots until the provided course. The state at the start of the
+        period needs to be the same as the current state.
+        :param period_start: Snapshot at the start of the knitted period
+        :param period_end: Snapshot at the end of the knitted period
+        :param last_course: Course to repeat the period up to
+        :return:
+        """
+        period = period_end.course - period_start.course
+        while self.course + period <= last_course:
+            self.copy_courses(period_start, period_end)
+        if self.course < last_course:
+            self.copy_courses(period_start, self.snapshots[period_start.course + last_course - self.course])
+
+    def copy_courses(self, first, last) -> None:
+        """
+        Copies the loops and problems of the courses between two snapshots to the current course. The loops on the
+        needles at the first snapshot are replaced by the loops at the same position on the current needles.
+        :param first: Snapshot at the first copied course
+        :param last: Snapshot after the last copied course
+        :return:
+        """
+        table = self.all_loops
+        loop_offset = len(table) - first.number_of_loops
+        course_offset = self.course - first.course
+        held_loops = {}
+        for bed, first_bed in zip(self.bed_loops, first.bed_loops):
+            for needle_loops, first_needle_loops in zip(bed, first_bed):
+                held_loops.update(zip(first_needle_loops, needle_loops))
+
+        def get_loop(loop):
+            return loop + loop_offset if loop >= first.number_of_loops else held_loops[loop]
+
+        table.append_repetition(first.number_of_loops, last.number_of_loops, course_offset, held_loops)
+
+        for problem in self.problems[first.number_of_problems:last.number_of_problems]:
+            self.create_problem(type(problem)(problem.course + course_offset, problem.wale))
+
+        self.bed_loops = [[[get_loop(loop) for loop in needle_loops] for needle_loops in bed] for bed in last.bed_loops]
+        self.course = last.course + course_offset
+        self.reset_tracking()
+
+    def reset_tracking(self) -> None:
+        """
+        Derives the tracked needles and the registered problems from the loops on the needles and the list of problems
+        :return:
+        """
+        min_thresh = min(MAX_NUMBER_OF_LOOPS_IN_NEEDLE_WARN_THRESH, MAX_NUMBER_OF_LOOPS_IN_NEEDLE_ERR_THRESH)
+        self.changed_needles = set()
+        self.full_needles = set()
+        self.oldest_src_courses = [[math.inf] * len(bed) for bed in self.bed_loops]
+        self.oldest_src_course_heap = []
+        for bed, bed_loops in enumerate(self.bed_loops):
+            for needle, needle_loops in enumerate(bed_loops):
+                if len(needle_loops) == 0:
+                    continue
+                src_course = min(self.all_loops.src_course[loop] for loop in needle_loops)
+                self.oldest_src_courses[bed][needle] = src_course
+                self.oldest_src_course_heap.append((src_course, bed, needle))
+                if len(needle_loops) >= min_thresh:
+                    self.full_needles.add((bed, needle))
+        heapq.heapify(self.oldest_src_course_heap)
+
+        self.problem_locations = {}
+        for index, problem in enumerate(self.problems):
+            family, _ = get_problem_family_and_severity(problem)
+            self.problem_locations.setdefault((problem.course, problem.wale), {})[family] = index
 
     def knit(self, bed) -> None:
         """
@@ -167,15 +446,10 @@ class VirtualKnittingMachine:
         :param bed:
         :return:
         """
-        new_loop = self.create_loop()
         existing_loops = self.bed_loops[bed][self.wale]
-        new_loop.src_loops = existing_loops
-
-        for l in existing_loops:
-            l.dst_course = self.course
-            l.dst_wale = self.wale
-            l.dst_loop = new_loop
+        new_loop = self.all_loops.append(self.course, self.wale, existing_loops)
         self.bed_loops[bed][self.wale] = [new_loop]
+        self.set_oldest_src_course(bed, self.wale, self.course)
 
     def tuck(self, bed) -> None:
         """
@@ -183,8 +457,26 @@ class VirtualKnittingMachine:
         :param bed:
         :return:
         """
-        new_loop = self.create_loop()
-        self.bed_loops[bed][self.wale].append(new_loop)
+        new_loop = self.all_loops.append(self.course, self.wale)
+        needle_loops = self.bed_loops[bed][self.wale]
+        if len(needle_loops) == 0:
+            self.set_oldest_src_course(bed, self.wale, self.course)
+        needle_loops.append(new_loop)
+        self.changed_needles.add((bed, self.wale))
+
+    def set_oldest_src_course(self, bed, needle, src_course) -> None:
+        """
+        Sets the oldest course the loops on a needle come from. A heap entry is only added if the needle was empty
+        before or if the course got older, otherwise the existing entry of the needle is still valid.
+        :param bed:
+        :param needle:
+        :param src_course:
+        :return:
+        """
+        previous_src_course = self.oldest_src_courses[bed][needle]
+        self.oldest_src_courses[bed][needle] = src_course
+        if src_course < previous_src_course:
+            heapq.heappush(self.oldest_src_course_heap, (src_course, bed, needle))
 
     def split(self, bed) -> None:
         """
@@ -192,9 +484,9 @@ class VirtualKnittingMachine:
         :param bed:
         :return:
         """
-        if bed is FRONT:
+        if bed == FRONT:
             self.transfer(FRONT_TO_BACK)
-        if bed is BACK:
+        if bed == BACK:
             self.transfer(BACK_TO_FRONT)
         self.knit(bed)
 
@@ -205,11 +497,10 @@ class VirtualKnittingMachine:
         :param offset:
         :return:
         """
-        if from_to is FRONT_TO_BACK or from_to is BACK_TO_FRONT:
-            front = self.bed_loops[FRONT]
-            back = self.bed_loops[BACK]
-            from_bed = front if from_to is FRONT_TO_BACK else back
-            to_bed = back if from_to is FRONT_TO_BACK else front
+        if from_to == FRONT_TO_BACK or from_to == BACK_TO_FRONT:
+            from_bed_index, to_bed_index = (FRONT, BACK) if from_to == FRONT_TO_BACK else (BACK, FRONT)
+            from_bed = self.bed_loops[from_bed_index]
+            to_bed = self.bed_loops[to_bed_index]
             wale = self.wale + offset
             transferred_loops = from_bed[wale]
 
@@ -220,7 +511,7 @@ class VirtualKnittingMachine:
                 self.create_problem(TransferWithOverlappedLoopsError(self.course, self.wale))
 
             # Check if all of the transferred loops are pickup stitches
-            transferred_pickup_loops = [loop for loop in transferred_loops if loop.is_pickup_stitch()]
+            transferred_pickup_loops = [loop for loop in transferred_loops if self.all_loops.is_pickup_stitch(loop)]
             if len(transferred_pickup_loops) > 0 and len(transferred_pickup_loops) == len(transferred_loops):
                 self.create_problem(TransferOfPickupStitchWarning(self.course, self.wale))
 
@@ -228,67 +519,93 @@ class VirtualKnittingMachine:
             if 0 <= wale < len(from_bed) and 0 <= wale + self.racking < len(to_bed):
                 from_bed[wale] = []
                 to_bed[wale + self.racking] += transferred_loops
+                self.changed_needles.add((to_bed_index, wale + self.racking))
+
+                # The loops keep their origin, so the oldest course moves with them
+                transferred_src_course = self.oldest_src_courses[from_bed_index][wale]
+                self.oldest_src_courses[from_bed_index][wale] = math.inf
+                if transferred_src_course < self.oldest_src_courses[to_bed_index][wale + self.racking]:
+                    self.set_oldest_src_course(to_bed_index, wale + self.racking, transferred_src_course)
             else:
                 self.create_problem(TransferOutOfBedError(self.course, self.wale))
 
     def create_problem(self, problem) -> None:
         """
-        Creates a new problem and adds it to the list of problems
+        Creates a new problem and adds it to the list of problems. A problem is only added once per location and
+        family. Errors override warnings of the same family in place and warnings are not added if an error exists.
+        Ignored problems are not added and a KnitPaintCheckException is raised right away if the problem stops the run.
         :param problem:
         :return:
         """
-        for index, p in enumerate(self.problems):
-            if p.course == problem.course and p.wale == problem.wale:
-                # Same problems will only be added once
-                if isinstance(problem, p.__class__):
-                    return
-
-                # Errors should override warnings
-                if (isinstance(p, NumberOfLoopsInNeedleWarning) and isinstance(problem, NumberOfLoopsInNeedleError)) or\
-                   (isinstance(p, LoopHoldWarning) and isinstance(problem, LoopHoldError)) or\
-                   (isinstance(p, RackingWarning) and isinstance(problem, RackingError)):
-                    self.problems[index] = problem
-                    return
-
-                # Warnings should not be added if an error exists
-                if (isinstance(problem, NumberOfLoopsInNeedleWarning) and isinstance(p, NumberOfLoopsInNeedleError)) or\
-                   (isinstance(problem, LoopHoldWarning) and isinstance(p, LoopHoldError)) or\
-                   (isinstance(problem, RackingWarning) and isinstance(p, RackingError)):
-                    return
-        self.problems.append(problem)
+        if isinstance(problem, self.ignore):
+            return
+
+        family, severity = get_problem_family_and_severity(problem)
+        location = self.problem_locations.setdefault((problem.course, problem.wale), {})
+        index = location.get(family)
+        if index is None:
+            location[family] = len(self.problems)
+            self.problems.append(problem)
+        elif severity > get_problem_family_and_severity(self.problems[index])[1]:
+            self.problems[index] = problem
+        else:
+            return
+
+        if self.stop_at is not None and isinstance(problem, self.stop_at):
+            raise KnitPaintCheckException(self.problems, self.all_loops)
 
     def check_number_of_loops_in_needles(self) -> None:
         """
-        Iterates over all needles to check how many loops are held by them. Adds problems if needles exceed a threshold
+        Checks how many loops are held by the needles that received loops since the last check and by the needles that
+        already held too many loops. Other needles can not exceed a threshold. Adds problems if needles exceed a
+        threshold
         :return:
         """
-        for bed in self.bed_loops:
-            for needle, needle_loops in enumerate(bed):
-                if len(needle_loops) >= MAX_NUMBER_OF_LOOPS_IN_NEEDLE_ERR_THRESH:
-                    self.create_problem(NumberOfLoopsInNeedleError(self.course, needle))
-                if len(needle_loops) >= MAX_NUMBER_OF_LOOPS_IN_NEEDLE_WARN_THRESH:
-                    self.create_problem(NumberOfLoopsInNeedleWarning(self.course, needle))
+        min_thresh = min(MAX_NUMBER_OF_LOOPS_IN_NEEDLE_WARN_THRESH, MAX_NUMBER_OF_LOOPS_IN_NEEDLE_ERR_THRESH)
+        for bed, needle in sorted(self.changed_needles | self.full_needles):
+            number_of_loops = len(self.bed_loops[bed][needle])
+            if number_of_loops >= MAX_NUMBER_OF_LOOPS_IN_NEEDLE_ERR_THRESH:
+                self.create_problem(NumberOfLoopsInNeedleError(self.course, needle))
+            if number_of_loops >= MAX_NUMBER_OF_LOOPS_IN_NEEDLE_WARN_THRESH:
+                self.create_problem(NumberOfLoopsInNeedleWarning(self.course, needle))
+            if number_of_loops >= min_thresh:
+                self.full_needles.add((bed, needle))
+            else:
+                self.full_needles.discard((bed, needle))
+        self.changed_needles.clear()
 
     def check_distance_of_loops(self) -> None:
         """
-        Iterates overe all currently held loops to check the vertical distance to their origin. Adds problems if a
-        distance exceeds a threshold
+        Checks the vertical distance of the currently held loops to their origin. Only needles whose oldest loop is
+        old enough to exceed a threshold are taken from the heap. Adds problems if a distance exceeds a threshold
         :return:
         """
-        for bed in self.bed_loops:
-            for needle, needle_loops in enumerate(bed):
-                for loop in needle_loops:
-                    if self.course - loop.src_course >= MAX_LOOP_HOLD_WARN_THRESH:
-                        self.create_problem(LoopHoldWarning(self.course, needle))
-                    if self.course - loop.src_course >= MAX_LOOP_HOLD_ERR_THRESH:
-                        self.create_problem(LoopHoldError(self.course, needle))
+        min_thresh = min(MAX_LOOP_HOLD_WARN_THRESH, MAX_LOOP_HOLD_ERR_THRESH)
+        newest_exceeding_src_course = self.course - min_thresh
+        heap = self.oldest_src_course_heap
+        exceeding_needles = set()
+        while len(heap) > 0 and heap[0][0] <= newest_exceeding_src_course:
+            _, bed, needle = heapq.heappop(heap)
+            src_course = self.oldest_src_courses[bed][needle]
+            if src_course <= newest_exceeding_src_course:
+                exceeding_needles.add((bed, needle))
+            elif src_course != math.inf:
+                # The entry is outdated because the needle was knitted, replace it with the current course
+                heapq.heappush(heap, (src_course, bed, needle))
+
+        for bed, needle in sorted(exceeding_needles):
+            src_course = self.oldest_src_courses[bed][needle]
+            heapq.heappush(heap, (src_course, bed, needle))
+            if self.course - src_course >= MAX_LOOP_HOLD_WARN_THRESH:
+                self.create_problem(LoopHoldWarning(self.course, needle))
+            if self.course - src_course >= MAX_LOOP_HOLD_ERR_THRESH:
+                self.create_problem(LoopHoldError(self.course, needle))
 
     def check_for_continuous_pickup_stitches(self):
         """
         Checks if any loop is a continuous pickup stitch
         :return:
         """
-        for loop in self.all_loops:
-            if loop.is_continuous_pickup_stitch():
-                problem = ContinuousPickupStitchWarning(loop.src_course, loop.src_wale)
-                self.create_problem(problem)
+        for loop in self.all_loops.get_continuous_pickup_stitches().tolist():
+            problem = ContinuousPickupStitchWarning(self.all_loops.src_course[loop], self.all_loops.src_wale[loop])
+            self.create_problem(problem)
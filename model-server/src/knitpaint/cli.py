@@ -0,0 +1,315 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import functools
+import multiprocessing
+
+# Extensions of files that are picked up when a directory is provided as input
+PATTERN_EXTENSIONS = ('.dat', '.lep', '.png', '.jpg', '.bmp')
+
+
+def find_input_files(inputs):
+    """
+    Expands the provided directories and glob patterns into a sorted list of files
+    :param inputs:
+    :return:
+    """
+    input_files = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for filename in sorted(os.listdir(input_path)):
+                if filename.lower().endswith(PATTERN_EXTENSIONS):
+                    input_files.append(os.path.join(input_path, filename))
+        elif glob.has_magic(input_path):
+            input_files += sorted(glob.glob(input_path, recursive=True))
+        else:
+            input_files.append(input_path)
+    return input_files
+
+
+def get_input_root(input_files):
+    """
+    Returns the common directory of all input files
+    :param input_files:
+    :return:
+    """
+    if len(input_files) == 0:
+        return os.getcwd()
+    return os.path.commonpath([os.path.dirname(os.path.abspath(input_file)) for input_file in input_files])
+
+
+def get_output_filename(input_file, output_dir, output_format, input_root=None):
+    """
+    Returns the path in the output directory with the name of the input file and the extension of the output format.
+    The directories of the input file below the input root are kept, so files with the same name in different
+    directories are not written to the same path.
+    :param input_file:
+    :param output_dir:
+    :param output_format:
+    :param input_root: Common directory of all input files, the directory of the input file by default
+    :return:
+    """
+    name = os.path.splitext(os.path.abspath(input_file))[0]
+    input_root = os.path.dirname(name) if input_root is None else input_root
+    return os.path.join(output_dir, os.path.relpath(name, input_root) + '.' + output_format)
+
+
+def find_duplicate_output(input_files, output_dir, output_format, input_root):
+    """
+    Returns the first pair of input files that would be written to the same output file or None if there is none
+    :param input_files:
+    :param output_dir:
+    :param output_format:
+    :param input_root:
+    :return:
+    """
+    inputs_by_output = {}
+    for input_file in input_files:
+        output_filename = get_output_filename(input_file, output_dir, output_format, input_root)
+        if output_filename in inputs_by_output:
+            return inputs_by_output[output_filename], input_file
+        inputs_by_output[output_filename] = input_file
+    return None
+
+
+def write_knitpaint(knitpaint, output_filename, scale=1):
+    """
+    Writes the knitpaint to the output file using the writer matching the extension
+    :param knitpaint:
+    :param output_filename:
+    :param scale:
+    :return:
+    """
+    os.makedirs(os.path.dirname(output_filename) or '.', exist_ok=True)
+    if output_filename.lower().endswith('.dat'):
+        knitpaint.write_dat(output_filename)
+    else:
+        knitpaint.write_image(output_filename, verbose=False, scale=scale)
+
+
+def convert_file(input_file, args):
+    """
+    Converts a single file into the output format
+    :param input_file:
+    :param args:
+    :return:
+    """
+    from . import KnitPaint
+    knitpaint = KnitPaint(input_file)
+    output_filename = get_output_filename(input_file, args.output_dir, args.format, args.input_root)
+    write_knitpaint(knitpaint, output_filename)
+    return {'output': output_filename, 'width': knitpaint.get_width(), 'height': knitpaint.get_height()}
+
+
+def normalize_file(input_file, args):
+    """
+    Normalizes a single file and writes the result in the output format
+    :param input_file:
+    :param args:
+    :return:
+    """
+    from . import KnitPaint
+    knitpaint = KnitPaint(input_file)
+    knitpaint.normalize_bitmap_data(has_option_line=not args.no_option_line, option_line=args.option_line)
+    if args.color_numbers:
+        knitpaint.normalize_color_numbers()
+    output_filename = get_output_filename(input_file, args.output_dir, args.format, args.input_root)
+    write_knitpaint(knitpaint, output_filename)
+    return {'output': output_filename, 'width': knitpaint.get_width(), 'height': knitpaint.get_height()}
+
+
+def check_file(input_file, args):
+    """
+    Checks a single file and summarizes the problems that occurred
+    :param input_file:
+    :param args:
+    :return:
+    """
+    from . import KnitPaint
+    from .check import check, check_pattern, problems, KnitPaintCheckException, KnitPaintCheckSyntaxError, \
+        KnitPaintCheckError, KnitPaintCheckWarning
+    knitpaint = KnitPaint(input_file)
+    result = {'width': knitpaint.get_width(), 'height': knitpaint.get_height(), 'status': 'correct',
+              'syntax_errors': 0, 'errors': 0, 'warnings': 0, 'first_problem': None}
+    stop_at = problems.KnitPaintCheckProblem if args.fail_fast else None
+    ignore = tuple(getattr(problems, name) for name in args.ignore)
+    try:
+        if args.as_pattern:
+            check_pattern(knitpaint, stop_at=stop_at, ignore=ignore)
+        else:
+            check(knitpaint, stop_at=stop_at, ignore=ignore)
+    except KnitPaintCheckException as e:
+        result['syntax_errors'] = len([p for p in e.problems if isinstance(p, KnitPaintCheckSyntaxError)])
+        result['errors'] = len([p for p in e.problems if isinstance(p, KnitPaintCheckError)])
+        result['warnings'] = len([p for p in e.problems if isinstance(p, KnitPaintCheckWarning)])
+        if result['syntax_errors'] > 0:
+            result['status'] = 'syntax_error'
+        elif result['errors'] > 0:
+            result['status'] = 'error'
+        else:
+            result['status'] = 'warning'
+        first_problem = e.problems[0]
+        result['first_problem'] = '{} ({}, {})'.format(first_problem.__class__.__name__, first_problem.course,
+                                                        first_problem.wale)
+    except NotImplementedError as e:
+        result['status'] = 'not_implemented'
+        result['first_problem'] = str(e)
+    return result
+
+
+def render_file(input_file, args):
+    """
+    Renders a preview image of a single file
+    :param input_file:
+    :param args:
+    :return:
+    """
+    from . import KnitPaint
+    knitpaint = KnitPaint(input_file)
+    output_filename = get_output_filename(input_file, args.output_dir, args.format, args.input_root)
+    write_knitpaint(knitpaint, output_filename, scale=args.scale)
+    return {'output': output_filename, 'width': knitpaint.get_width(), 'height': knitpaint.get_height()}
+
+
+# Report columns of each command in addition to the input file, the result and the duration
+COMMANDS = {
+    'convert': (convert_file, ['output', 'width', 'height']),
+    'normalize': (normalize_file, ['output', 'width', 'height']),
+    'check': (check_file, ['width', 'height', 'status', 'syntax_errors', 'errors', 'warnings', 'first_problem']),
+    'render': (render_file, ['output', 'width', 'height'])
+}
+
+
+def run_task(input_file, command, args):
+    """
+    Runs a command for a single file. Failures are reported instead of raised, so a single broken file does not stop
+    the whole run.
+    :param input_file:
+    :param command:
+    :param args:
+    :return:
+    """
+    start = time.perf_counter()
+    row = {'file': input_file, 'result': 'ok', 'message': None}
+    try:
+        row.update(COMMANDS[command][0](input_file, args))
+    except Exception as e:
+        row['result'] = 'failed'
+        row['message'] = '{}: {}'.format(e.__class__.__name__, e)
+    row['duration'] = round(time.perf_counter() - start, 6)
+    return row
+
+
+class ReportWriter:
+    """
+    Streams rows of results into a CSV or JSONL file. The format is derived from the file extension.
+    """
+
+    def __init__(self, file, fieldnames, report_format):
+        self.file = file
+        self.report_format = report_format
+        self.csv_writer = None
+        if report_format == 'csv':
+            self.csv_writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write(self, row):
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+
+def get_warning_names():
+    """
+    Returns the class names of all warnings of the check
+    :return:
+    """
+    from .check import problems
+    return sorted(name for name, value in vars(problems).items() if isinstance(value, type)
+                  and issubclass(value, problems.KnitPaintCheckWarning) and value is not problems.KnitPaintCheckWarning)
+
+
+def get_parser():
+    """
+    Builds the parser of the command line arguments
+    :return:
+    """
+    parser = argparse.ArgumentParser(prog='python -m knitpaint',
+                                     description='Converts, normalizes, checks and renders KnitPaint files in bulk')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    def add_subparser(name, help_text, output_format=None):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument('inputs', nargs='+', help='Files, directories or glob patterns')
+        subparser.add_argument('--report', help='Path of the CSV or JSONL report. Defaults to JSONL on stdout')
+        subparser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+        subparser.add_argument('--chunk-size', type=int, default=16, help='Number of files submitted per task')
+        subparser.add_argument('--quiet', action='store_true', help='Disable progress output')
+        if output_format is not None:
+            subparser.add_argument('--output-dir', required=True, help='Directory for the output files')
+            subparser.add_argument('--format', default=output_format, help='Output format, e.g. png, bmp or jpg')
+        return subparser
+
+    add_subparser('convert', 'Convert files into another format', 'png')
+
+    normalize_parser = add_subparser('normalize', 'Crop files and optionally replace the option line', 'png')
+    normalize_parser.add_argument('--no-option-line', action='store_true', help='Inputs do not have an option line')
+    normalize_parser.add_argument('--option-line', default='keep', choices=['keep', 'remove', 'default'])
+    normalize_parser.add_argument('--color-numbers', action='store_true', help='Also normalize color numbers')
+
+    check_parser = add_subparser('check', 'Check files for syntax errors, knit errors and knit warnings')
+    check_parser.add_argument('--as-pattern', action='store_true', help='Check files as repeated patterns')
+    check_parser.add_argument('--fail-fast', action='store_true', help='Stop checking a file at its first problem')
+    check_parser.add_argument('--ignore', nargs='+', default=[], choices=get_warning_names(), metavar='WARNING',
+                              help='Warnings that are not checked for, e.g. NumberOfLoopsInNeedleWarning')
+
+    render_parser = add_subparser('render', 'Render preview images', 'png')
+    render_parser.add_argument('--scale', type=int, default=1, help='Number of pixels per stitch')
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the command line tool
+    :param argv:
+    :return:
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    input_files = find_input_files(args.inputs)
+    args.input_root = get_input_root(input_files)
+    if getattr(args, 'output_dir', None) is not None:
+        duplicate = find_duplicate_output(input_files, args.output_dir, args.format, args.input_root)
+        if duplicate is not None:
+            parser.error('{} and {} would be written to the same output file'.format(*duplicate))
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    fieldnames = ['file', 'result', 'message'] + COMMANDS[args.command][1] + ['duration']
+    report_file = open(args.report, 'w', newline='') if args.report is not None else sys.stdout
+    report_format = 'csv' if args.report is not None and args.report.lower().endswith('.csv') else 'jsonl'
+    report = ReportWriter(report_file, fieldnames, report_format)
+
+    task = functools.partial(run_task, command=args.command, args=args)
+    failed = 0
+    try:
+        with multiprocessing.Pool(max(1, args.workers)) as pool:
+            for processed, row in enumerate(pool.imap_unordered(task, input_files, args.chunk_size), 1):
+                report.write(row)
+                failed += row['result'] == 'failed'
+                if not args.quiet:
+                    sys.stderr.write('\rProcessed {}/{} files, {} failed'.format(processed, len(input_files), failed))
+                    sys.stderr.flush()
+    finally:
+        if report_file is not sys.stdout:
+            report_file.close()
+    if not args.quiet:
+        sys.stderr.write('\n')
+    return 1 if failed > 0 else 0
@@ -1,5 +1,108 @@
+import struct
 import numpy as np
-import cv2
+
+# Number of colors that are resolved at once when building the lookup table. Limits the size of the distance matrix.
+LOOKUP_CHUNK_SIZE = 4096
+
+
+class ColorLookup:
+    """
+    Resolves RGB colors to the number of the nearest color in a color table. Resolved colors are memoized in a dense
+    lookup table indexed by the packed RGB value, so each color is only compared to the color table once.
+    """
+
+    def __init__(self, color_table):
+        self.color_table = np.array(color_table, dtype=np.int64)
+        self.lut = np.zeros(1 << 24, dtype=np.uint8)
+        self.resolved = np.zeros(1 << 24, dtype=bool)
+
+    def lookup(self, colors_rgb):
+        """
+        Returns the color numbers for an array of RGB colors. The last dimension of the array has to contain the
+        channels, the result has the shape of the remaining dimensions.
+        :param colors_rgb:
+        :return:
+        """
+        colors_rgb = np.asarray(colors_rgb, dtype=np.uint32)
+        packed = (colors_rgb[..., 0] << 16) | (colors_rgb[..., 1] << 8) | colors_rgb[..., 2]
+
+        # Find the nearest color number for every color that has not been seen before
+        unresolved = np.unique(packed[~self.resolved[packed]])
+        for start in range(0, unresolved.size, LOOKUP_CHUNK_SIZE):
+            chunk = unresolved[start:start + LOOKUP_CHUNK_SIZE]
+            chunk_rgb = np.stack(((chunk >> 16) & 255, (chunk >> 8) & 255, chunk & 255), axis=-1).astype(np.int64)
+            distances = ((chunk_rgb[:, np.newaxis, :] - self.color_table[np.newaxis, :, :]) ** 2).sum(axis=2)
+            self.lut[chunk] = np.argmin(distances, axis=1)
+            self.resolved[chunk] = True
+
+        return self.lut[packed]
+
+
+# The lookup of the most recently used color table. It is replaced as soon as a different color table is used.
+_color_lookup_key = None
+_color_lookup = None
+
+
+def get_color_lookup(color_table) -> ColorLookup:
+    """
+    Returns the cached lookup for the provided color table and creates a new one if the color table changed
+    :param color_table:
+    :return:
+    """
+    global _color_lookup_key, _color_lookup
+    key = np.asarray(color_table, dtype=np.int64).tobytes()
+    if _color_lookup is None or _color_lookup_key != key:
+        _color_lookup = ColorLookup(color_table)
+        _color_lookup_key = key
+    return _color_lookup
+
+
+def read_image_size(image_filename):
+    """
+    Reads the width and height of a PNG, BMP or JPEG image from its header without decoding the image. Other formats
+    are decoded to find their size.
+    :param image_filename:
+    :return: width, height
+    """
+    with open(image_filename, 'rb') as file:
+        head = file.read(26)
+        if head.startswith(b'\x89PNG\r\n\x1a\n'):
+            return struct.unpack('>II', head[16:24])
+        if head.startswith(b'BM'):
+            width, height = struct.unpack('<ii', head[18:26])
+            return width, abs(height)
+        if head.startswith(b'\xff\xd8'):
+            # Walk the JPEG segments until a start of frame segment is found
+            file.seek(2)
+            while True:
+                marker = file.read(2)
+                if len(marker) < 2 or marker[0] != 0xff:
+                    break
+                if 0xc0 <= marker[1] <= 0xcf and marker[1] not in (0xc4, 0xc8, 0xcc):
+                    height, width = struct.unpack('>xxxHH', file.read(7))
+                    return width, height
+                segment_length, = struct.unpack('>H', file.read(2))
+                file.seek(segment_length - 2, 1)
+    import cv2
+    height, width = cv2.imread(image_filename, cv2.IMREAD_COLOR).shape[:2]
+    return width, height
+
+
+def read_image_header(image_filename, dst=None):
+    """
+    Sets the header information of the destination according to the image size without decoding the image
+    :param image_filename:
+    :param dst: KnitPaint destination
+    :return:
+    """
+    if dst is None:
+        from . import KnitPaint
+        dst = KnitPaint()
+
+    width, height = read_image_size(image_filename)
+    dst.header_x_end = dst.header_x_start + width - 1
+    dst.header_y_end = dst.header_y_start + height - 1
+    return dst
 
 
 def read_image(image_filename, dst=None):
@@ -13,28 +116,14 @@ def read_image(image_filename, dst=None):
         from . import KnitPaint
         dst = KnitPaint()
 
-    # Read image and bring it into the correct shape
+    # Read image and bring it into the correct shape. OpenCV is only imported when it is needed.
+    import cv2
     image_bgr = cv2.imread(image_filename, cv2.IMREAD_COLOR)
     image_rgb = image_bgr[:, :, ::-1]
-    height, width, _ = image_rgb.shape
-    colors = image_rgb.reshape((width * height, 3))
 
     # Search for matching color numbers for each color use the nearest color if the color is not in the list
-    def find_nearest_color_number(color):
-        nearest_index = None
-        nearest_distance = None
-        for index, color_table_item in enumerate(dst.color_table):
-            distance = np.linalg.norm(color - np.array(color_table_item))
-            if nearest_distance is None or distance < nearest_distance:
-                nearest_index = index
-                nearest_distance = distance
-            if distance == 0:
-                break
-        return nearest_index
-
-    color_numbers = np.apply_along_axis(find_nearest_color_number, 1, colors)
-
-    # Reshape the result and set it
-    bitmap_data = color_numbers.reshape((height, width))
+    bitmap_data = get_color_lookup(dst.color_table).lookup(image_rgb)
+
+    # Set the result
     dst.set_np_bitmap_data(bitmap_data, bottom_to_top=True)
     return dst
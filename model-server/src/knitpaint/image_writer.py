@@ -1,19 +1,89 @@
 import numpy as np
-import cv2
 
+# The lookup table of the most recently used color table. It is replaced as soon as a different color table is used.
+_color_lut_key = None
+_color_lut = None
 
-def write_image(src, output_filename, verbose=True):
+
+def get_color_lut(color_table):
+    """
+    Returns a cached lookup table that maps color numbers to BGR colors. A new one is created if the color table changed
+    :param color_table:
+    :return:
+    """
+    global _color_lut_key, _color_lut
+    key = np.asarray(color_table, dtype=np.int64).tobytes()
+    if _color_lut is None or _color_lut_key != key:
+        _color_lut = np.ascontiguousarray(np.array(color_table, dtype=np.uint8)[:, ::-1])
+        _color_lut_key = key
+    return _color_lut
+
+
+def render_bgr(src, scale=1, bottom_to_top=True):
+    """
+    Renders the KnitPaint as numpy array with BGR channels as used by OpenCV. Every stitch is rendered as square of
+    scale x scale pixels.
+    :param src: KnitPaint source
+    :param scale: Number of pixels per stitch in each direction
+    :param bottom_to_top: Defines if instructions in the image go from bottom to top as in the regular preview image
+    :return:
+    """
+    bitmap_np = src.get_np_bitmap_data(bottom_to_top=bottom_to_top)
+    bitmap_lut = get_color_lut(src.color_table)
+
+    # Upscale the color numbers by indexing the repeated rows and columns, then look up the BGR colors of all pixels
+    height, width = bitmap_np.shape
+    rows = np.repeat(np.arange(height), scale)[:, np.newaxis]
+    cols = np.repeat(np.arange(width), scale)[np.newaxis, :]
+    return bitmap_lut[bitmap_np[rows, cols]]
+
+
+def render_image(src, image_format=None, scale=1, bottom_to_top=True, quality=None):
+    """
+    Renders a preview image of the provided KnitPaint in memory. Every stitch is rendered as square of scale x scale
+    pixels.
+
+    :param src: KnitPaint source
+
+    :param image_format:
+    Format of the encoded image like 'png', 'jpg' or 'bmp'. If no format is provided, the image is returned as numpy
+    array with RGB channels instead of being encoded.
+
+    :param scale: Number of pixels per stitch in each direction
+
+    :param bottom_to_top:
+    Defines if instructions in the image go from bottom to top as in the regular preview image
+
+    :param quality: Optional JPEG quality from 0 to 100
+
+    :return:
+    """
+    image_bgr = render_bgr(src, scale=scale, bottom_to_top=bottom_to_top)
+    if image_format is None:
+        return image_bgr[:, :, ::-1]
+
+    # OpenCV is only imported when it is needed
+    import cv2
+    params = []
+    if quality is not None:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    success, encoded = cv2.imencode('.' + image_format.lstrip('.'), image_bgr, params)
+    if not success:
+        raise ValueError('Image could not be encoded as ' + image_format)
+    return encoded.tobytes()
+
+
+def write_image(src, output_filename, verbose=True, scale=1):
     """
     Builds a preview image of the provided KnitPaint file using Numpy and OpenCV
     :param src: KnitPaint source
     :param output_filename:
     :param verbose: Set to False to disable logging on success
+    :param scale: Number of pixels per stitch in each direction
     :return:
     """
-    bitmap_np = src.get_np_bitmap_data(bottom_to_top=True)
-    bitmap_lut = np.array(src.color_table)
-    image_rgb = bitmap_lut[bitmap_np]
-    image_bgr = image_rgb[:, :, ::-1]
+    image_bgr = render_bgr(src, scale=scale)
+    import cv2
     cv2.imwrite(output_filename, image_bgr)
     if verbose:
         print('Saved preview image to ' + output_filename)
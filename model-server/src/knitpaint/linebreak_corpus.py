@@ -0,0 +1,158 @@
+import os
+import numpy as np
+from .linebreak_reader import read_linebreak_bytes
+
+# Number of bytes that are scanned at once when searching for the framing characters of a corpus
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def write_linebreak_corpus(knitpaints, output_filename, start_char, linebreak_char, end_char, verbose=True):
+    """
+    Writes multiple knitpaint objects into a single corpus file. Each pattern is framed with the start and end
+    character and every line is terminated with the linebreak character. A sidecar index with the offsets of all
+    patterns is written as well.
+    :param knitpaints: Iterable of KnitPaint objects
+    :param output_filename:
+    :param start_char:
+    :param linebreak_char:
+    :param end_char:
+    :param verbose:
+    :return:
+    """
+    offsets = []
+    position = 0
+    with open(output_filename, "w+b") as file:
+        for knitpaint in knitpaints:
+            bitmap_np = knitpaint.get_np_bitmap_data()
+            framed = np.empty((bitmap_np.shape[0], bitmap_np.shape[1] + 1), dtype=np.uint8)
+            framed[:, :-1] = bitmap_np
+            framed[:, -1] = linebreak_char
+            file.write(bytes([start_char]))
+            file.write(framed.tobytes())
+            file.write(bytes([end_char]))
+            offsets.append((position + 1, position + 1 + framed.size))
+            position += framed.size + 2
+    np.save(get_index_filename(output_filename), np.array(offsets, dtype=np.int64).reshape((-1, 2)))
+    if verbose:
+        print('Saved corpus with ' + str(len(offsets)) + ' patterns to ' + output_filename)
+
+
+def read_linebreak_corpus(input_filename, start_char, linebreak_char, end_char, padding_char=0, as_array=False):
+    """
+    Memory maps a corpus file and yields the contained patterns one at a time. The file is scanned in chunks, so it does
+    not need to fit into memory.
+    :param input_filename:
+    :param start_char:
+    :param linebreak_char:
+    :param end_char:
+    :param padding_char:
+    :param as_array: Set to True to yield numpy arrays instead of KnitPaint objects. Arrays of patterns with lines of
+    equal length are read only views on the memory mapped file.
+    :return:
+    """
+    corpus = np.memmap(input_filename, dtype=np.uint8, mode='r')
+    for start, end in scan_linebreak_corpus(corpus, start_char, end_char):
+        yield _read_frame(corpus[start:end], linebreak_char, padding_char, as_array)
+
+
+def scan_linebreak_corpus(corpus, start_char, end_char, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Scans the provided corpus in chunks and yields the start and end offsets of the content of each pattern
+    :param corpus: Numpy array or memory map of the corpus
+    :param start_char:
+    :param end_char:
+    :param chunk_size:
+    :return:
+    """
+    pattern_start = None
+    for chunk_start in range(0, corpus.size, chunk_size):
+        chunk = corpus[chunk_start:chunk_start + chunk_size]
+        frame_chars = np.flatnonzero((chunk == start_char) | (chunk == end_char))
+        for position in (frame_chars + chunk_start).tolist():
+            if corpus[position] == start_char:
+                pattern_start = position + 1
+            elif pattern_start is not None:
+                yield pattern_start, position
+                pattern_start = None
+
+
+def get_index_filename(corpus_filename):
+    """
+    Returns the filename of the sidecar index of a corpus file
+    :param corpus_filename:
+    :return:
+    """
+    return corpus_filename + '.idx.npy'
+
+
+class LinebreakCorpus:
+    """
+    Provides random access to the patterns of a memory mapped corpus file. The offsets of all patterns are read from a
+    sidecar index, which is built on first use if it does not exist or is older than the corpus.
+    """
+
+    def __init__(self, input_filename, start_char, linebreak_char, end_char, padding_char=0):
+        self.corpus = np.memmap(input_filename, dtype=np.uint8, mode='r')
+        self.linebreak_char = linebreak_char
+        self.padding_char = padding_char
+
+        index_filename = get_index_filename(input_filename)
+        if os.path.isfile(index_filename) and os.path.getmtime(index_filename) >= os.path.getmtime(input_filename):
+            self.offsets = np.load(index_filename)
+        else:
+            offsets = list(scan_linebreak_corpus(self.corpus, start_char, end_char))
+            self.offsets = np.array(offsets, dtype=np.int64).reshape((-1, 2))
+            np.save(index_filename, self.offsets)
+
+    def __len__(self):
+        return self.offsets.shape[0]
+
+    def __getitem__(self, index):
+        """
+        Returns the pattern with the provided index as KnitPaint object
+        :param index:
+        :return:
+        """
+        return self.get(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def get(self, index, as_array=False):
+        """
+        Returns the pattern with the provided index
+        :param index:
+        :param as_array: Set to True to return a numpy array instead of a KnitPaint object
+        :return:
+        """
+        start, end = self.offsets[index]
+        return _read_frame(self.corpus[start:end], self.linebreak_char, self.padding_char, as_array)
+
+
+def _read_frame(frame, linebreak_char, padding_char, as_array):
+    """
+    Reads the content of a single framed pattern. If all lines have the same length and end with a linebreak, the
+    array is a view on the frame, otherwise the lines are padded.
+    :param frame:
+    :param linebreak_char:
+    :param padding_char:
+    :param as_array:
+    :return:
+    """
+    linebreaks = np.flatnonzero(frame == linebreak_char)
+    bitmap_np = None
+    if linebreaks.size > 0 and linebreaks[-1] == frame.size - 1:
+        line_length = linebreaks[0] + 1
+        if frame.size % line_length == 0 and \
+                np.array_equal(linebreaks, np.arange(line_length - 1, frame.size, line_length)):
+            bitmap_np = frame.reshape((-1, line_length))[:, :-1]
+
+    if bitmap_np is None:
+        knitpaint = read_linebreak_bytes(frame, linebreak_char, padding_char=padding_char)
+        return knitpaint.get_np_bitmap_data() if as_array else knitpaint
+
+    if as_array:
+        return bitmap_np
+    from . import KnitPaint
+    return KnitPaint(bitmap_np)
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def read_linebreak(input_file, linebreak_char, padding_char=0, target_width=None, target_height=None, dst=None):
     """
     Creates new bitmap data by separating lines from the input using the provided linebreak character
@@ -35,8 +38,9 @@ def read_linebreak_file(input_filename, linebreak_char, padding_char=0, target_w
 
 def read_linebreak_bytes(input_bytes, linebreak_char, padding_char=0, target_width=None, target_height=None, dst=None):
     """
-    Creates new bitmap data by separating lines using the provided linebreak character
-    :param input_bytes:
+    Creates new bitmap data by separating lines using the provided linebreak character. The lines are located with a
+    single scan and scattered into a padded matrix.
+    :param input_bytes: bytes, bytearray, memoryview, numpy array or list of color numbers
     :param linebreak_char:
     :param padding_char:
     :param target_width:
@@ -48,38 +52,36 @@ def read_linebreak_bytes(input_bytes, linebreak_char, padding_char=0, target_wid
         from . import KnitPaint
         dst = KnitPaint()
 
-    # Read lines
-    lines = []
-    current_line = []
-    width = 0
-    for bitmap_element in input_bytes:
-        if bitmap_element == linebreak_char:
-            if len(current_line) > width:
-                width = len(current_line)
-            lines.append(current_line)
-            current_line = []
-        else:
-            current_line.append(bitmap_element)
-    if len(current_line) > 0:
-        if len(current_line) > width:
-            width = len(current_line)
-        lines.append(current_line)
+    if isinstance(input_bytes, (bytes, bytearray, memoryview)):
+        input_np = np.frombuffer(input_bytes, dtype=np.uint8)
+    else:
+        input_np = np.asarray(input_bytes).ravel()
+
+    # Find the linebreaks. Every linebreak ends a line, the remainder is only a line if it is not empty
+    is_linebreak = input_np == linebreak_char
+    linebreaks = np.flatnonzero(is_linebreak)
+    line_starts = np.concatenate(([0], linebreaks + 1))
+    line_ends = np.append(linebreaks, input_np.size)
+    if line_starts[-1] == line_ends[-1]:
+        line_starts = line_starts[:-1]
+        line_ends = line_ends[:-1]
+    width = int((line_ends - line_starts).max()) if line_starts.size > 0 else 0
+    height = line_starts.size
 
     # Allow to set a predefined width and height
     if target_width is not None:
         width = target_width
-
     if target_height is not None:
-        lines = lines[:target_height]
-        lines += [[]] * (target_height - len(lines))
+        height = target_height
 
-    # Make lines all the same length by padding the right side with black and concatenate to build new bitmap data
-    new_bitmap_data = []
-    for current_line in lines:
-        current_line = current_line[:width]
-        current_line += [padding_char] * (width - len(current_line))
-        new_bitmap_data += current_line
+    # Scatter all elements into a matrix that is padded with the padding char on the right side
+    new_bitmap_data = np.full((height, width), padding_char, dtype=np.uint8)
+    positions = np.flatnonzero(~is_linebreak)
+    rows = np.cumsum(is_linebreak)[positions]
+    cols = positions - line_starts[rows]
+    in_bounds = (rows < height) & (cols < width)
+    new_bitmap_data[rows[in_bounds], cols[in_bounds]] = input_np[positions[in_bounds]]
 
     # Set the new bitmap data
-    dst.set_bitmap_data(new_bitmap_data, width, len(lines))
+    dst.set_np_bitmap_data(new_bitmap_data)
     return dst
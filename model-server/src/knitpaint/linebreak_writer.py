@@ -15,7 +15,7 @@ def write_linebreak(src, output_filename=None, linebreak_char=None, verbose=True
         src.add_char_col(linebreak_char)
 
     # Extract the result, return it if no output filename is provided
-    output_bytes = bytearray(src.bitmap_data)
+    output_bytes = bytearray(src.get_np_bitmap_data().tobytes())
     if output_filename is None:
         return output_bytes
 
@@ -0,0 +1,291 @@
+import time
+import numpy as np
+
+# Parameters of the LZSS compression used by "SDS LZSS COMPRESS Ver 1.00". The ring buffer holds LZSS_N bytes, matches
+# are at most LZSS_F bytes long and only matches longer than LZSS_THRESHOLD bytes are encoded as reference.
+LZSS_N = 4096
+LZSS_F = 18
+LZSS_THRESHOLD = 2
+
+# Number of candidates that are compared when searching for a match during encoding
+LZSS_MAX_CANDIDATES = 8
+
+# Number of hash chains of the encoder and the position that marks the end of a chain. The end is too far away from any
+# position to be referenced.
+LZSS_HASH_SIZE = 1 << 15
+LZSS_NO_POSITION = -LZSS_N
+
+# Number of bytes the encoder adds to its buffer at once
+LZSS_BLOCK_SIZE = 64 * 1024
+
+
+class LZSSDecoder:
+    """
+    Incrementally decodes LZSS compressed data. Each group of up to eight tokens is preceded by a flag byte. A set bit
+    marks a literal byte, a cleared bit marks a two byte reference to a position in the ring buffer and a length.
+    """
+
+    def __init__(self, fill_char=0x20):
+        """
+        :param fill_char: Byte the ring buffer is initially filled with
+        """
+        # The buffer holds the decoded history. A byte at absolute position p is stored at ring buffer position
+        # p % LZSS_N. The initial ring buffer is placed in front, so the first decoded byte is at LZSS_N - LZSS_F.
+        self.buffer = bytearray([fill_char]) * (2 * LZSS_N - LZSS_F)
+        self.buffer_start = 0
+        self.output_start = len(self.buffer)
+        self.pending = b''
+        self.flags = 0
+        self.flag_bits = 0
+
+    def feed(self, chunk):
+        """
+        Decodes the provided chunk of compressed data and returns the decoded bytes. Incomplete tokens at the end of the
+        chunk are kept until the next chunk is fed.
+        :param chunk:
+        :return:
+        """
+        data = self.pending + bytes(chunk) if self.pending else bytes(chunk)
+        buffer = self.buffer
+        position = 0
+        flags = self.flags
+        flag_bits = self.flag_bits
+        data_length = len(data)
+
+        while True:
+            if flag_bits == 0:
+                if position >= data_length:
+                    break
+                flags = data[position]
+                flag_bits = 8
+                position += 1
+
+            if flags & 1:
+                # Copy a run of literals at once
+                run = 1
+                while run < flag_bits and (flags >> run) & 1:
+                    run += 1
+                run = min(run, data_length - position)
+                if run == 0:
+                    break
+                buffer += data[position:position + run]
+                position += run
+                flags >>= run
+                flag_bits -= run
+            else:
+                if position + 1 >= data_length:
+                    break
+                c1 = data[position]
+                c2 = data[position + 1]
+                position += 2
+                ring_position = c1 | ((c2 & 0xf0) << 4)
+                length = (c2 & 0x0f) + LZSS_THRESHOLD + 1
+
+                # Find the most recent absolute position that maps to the ring buffer position
+                write_position = self.buffer_start + len(buffer)
+                source = write_position - LZSS_N + (ring_position - write_position) % LZSS_N - self.buffer_start
+                source_end = source + length
+                if source_end <= len(buffer):
+                    buffer += buffer[source:source_end]
+                else:
+                    # The reference overlaps the bytes it produces, so the available part repeats
+                    period = buffer[source:]
+                    buffer += (period * -(-length // len(period)))[:length]
+                flags >>= 1
+                flag_bits -= 1
+
+        self.pending = data[position:]
+        self.flags = flags
+        self.flag_bits = flag_bits
+
+        # Return the new output and keep at least one ring buffer of history. The history is only trimmed by
+        # multiples of the ring buffer size to keep positions aligned.
+        output = bytes(buffer[self.output_start:])
+        trim = (len(buffer) - LZSS_N) // LZSS_N * LZSS_N
+        if trim > 0:
+            del buffer[:trim]
+            self.buffer_start += trim
+        self.output_start = len(buffer)
+        return output
+
+
+class LZSSEncoder:
+    """
+    Incrementally encodes data with LZSS. Matches are searched with hash chains over the last bytes. The output can be
+    decoded by LZSSDecoder or any decoder following the same parameters.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.buffer_start = 0
+        self.position = 0
+
+        # The hash chains link the positions of the last ring buffer with the same hash of their next three bytes. head
+        # holds the most recent position of each hash and prev the previous position of each ring buffer position, so
+        # positions that can not be referenced anymore are overwritten instead of kept.
+        self.head = [LZSS_NO_POSITION] * LZSS_HASH_SIZE
+        self.prev = [LZSS_NO_POSITION] * LZSS_N
+        self.tokens = bytearray()
+        self.flags = 0
+        self.flag_bits = 0
+
+    def feed(self, chunk):
+        """
+        Encodes the provided chunk and returns the compressed bytes that are complete. Bytes close to the end of the
+        chunk are kept until more data is fed or flush is called. Large chunks are encoded in blocks, so the memory used
+        by the encoder does not grow with the size of the chunk.
+        :param chunk:
+        :return:
+        """
+        chunk = memoryview(chunk).cast('B')
+        output = bytearray()
+        for start in range(0, len(chunk), LZSS_BLOCK_SIZE):
+            self.buffer += chunk[start:start + LZSS_BLOCK_SIZE]
+            output += self._encode(LZSS_F)
+        return bytes(output)
+
+    def flush(self):
+        """
+        Encodes all remaining data and returns the compressed bytes
+        :return:
+        """
+        output = self._encode(0)
+        if self.flag_bits > 0:
+            output += bytes([self.flags]) + self.tokens
+            self.tokens = bytearray()
+            self.flags = 0
+            self.flag_bits = 0
+        return output
+
+    def _encode(self, lookahead):
+        """
+        Encodes all positions that have at least the provided number of bytes following them
+        :param lookahead:
+        :return:
+        """
+        buffer = self.buffer
+        buffer_start = self.buffer_start
+        head = self.head
+        prev = self.prev
+        tokens = self.tokens
+        flags = self.flags
+        flag_bits = self.flag_bits
+        output = bytearray()
+        end = buffer_start + len(buffer) - lookahead
+        position = self.position
+
+        # Hash the next three bytes of all positions from the current position at once
+        hash_start = position
+        hash_data = np.frombuffer(buffer[position - buffer_start:], dtype=np.uint8).astype(np.intp)
+        hashes = (((hash_data[:-2] << 10) ^ (hash_data[1:-1] << 5) ^ hash_data[2:]) % LZSS_HASH_SIZE).tolist()
+        hash_end = hash_start + len(hashes)
+
+        while position < end:
+            index = position - buffer_start
+            max_length = min(LZSS_F, buffer_start + len(buffer) - position)
+            best_length = 0
+            best_source = 0
+
+            # Compare the current bytes with the most recent previous positions with the same hash. Different bytes can
+            # have the same hash, so the matches are counted from the first byte. The length of a match is the number
+            # of leading bytes that are equal, which is derived from the highest bit that differs.
+            if max_length > LZSS_THRESHOLD:
+                source = head[hashes[position - hash_start]]
+                candidates = LZSS_MAX_CANDIDATES
+                target = int.from_bytes(buffer[index:index + max_length], 'big')
+                while candidates > 0 and position - source <= LZSS_N - LZSS_F:
+                    source_index = source - buffer_start
+                    difference = target ^ int.from_bytes(buffer[source_index:source_index + max_length], 'big')
+                    length = max_length - (difference.bit_length() + 7) // 8
+                    if length > best_length:
+                        best_length = length
+                        best_source = source
+                        if length == max_length:
+                            break
+                    source = prev[source % LZSS_N]
+                    candidates -= 1
+
+            if best_length > LZSS_THRESHOLD:
+                ring_position = (best_source + LZSS_N - LZSS_F) % LZSS_N
+                tokens.append(ring_position & 0xff)
+                tokens.append(((ring_position >> 4) & 0xf0) | (best_length - LZSS_THRESHOLD - 1))
+                step = best_length
+            else:
+                flags |= 1 << flag_bits
+                tokens.append(buffer[index])
+                step = 1
+
+            flag_bits += 1
+            if flag_bits == 8:
+                output.append(flags)
+                output += tokens
+                tokens.clear()
+                flags = 0
+                flag_bits = 0
+
+            # Add all encoded positions to the hash chains
+            for chained in range(position, min(position + step, hash_end)):
+                hash_value = hashes[chained - hash_start]
+                prev[chained % LZSS_N] = head[hash_value]
+                head[hash_value] = chained
+            position += step
+
+        # Drop history that can not be referenced anymore
+        self.position = position
+        self.flags = flags
+        self.flag_bits = flag_bits
+        trim = position - buffer_start - LZSS_N
+        if trim > 0:
+            del buffer[:trim]
+            self.buffer_start += trim
+        return bytes(output)
+
+
+def lzss_decompress(data, fill_char=0x20):
+    """
+    Decompresses the provided LZSS compressed bytes in one call
+    :param data:
+    :param fill_char: Byte the ring buffer is initially filled with
+    :return:
+    """
+    return LZSSDecoder(fill_char).feed(data)
+
+
+def lzss_compress(data):
+    """
+    Compresses the provided bytes with LZSS in one call
+    :param data:
+    :return:
+    """
+    encoder = LZSSEncoder()
+    return encoder.feed(data) + encoder.flush()
+
+
+def benchmark(size=1024 * 1024, repetitions=3):
+    """
+    Measures the throughput of the codec on random KnitPaint-like data and prints the results
+    :param size: Number of uncompressed bytes
+    :param repetitions:
+    :return:
+    """
+    # Mostly single jersey with some random patterns makes for a realistic compression ratio
+    data = np.ones(size, dtype=np.uint8)
+    random_positions = np.random.randint(0, size, size // 10)
+    data[random_positions] = np.random.randint(0, 20, random_positions.size)
+    data = data.tobytes()
+
+    compress_time = float('inf')
+    decompress_time = float('inf')
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        compressed = lzss_compress(data)
+        compress_time = min(compress_time, time.perf_counter() - start)
+        start = time.perf_counter()
+        decompressed = lzss_decompress(compressed)
+        decompress_time = min(decompress_time, time.perf_counter() - start)
+    assert decompressed == data, 'Expected decompressed data to equal the input'
+
+    megabytes = size / 1024 / 1024
+    print('Compression ratio: {:.3f}'.format(len(compressed) / size))
+    print('Compression: {:.2f} MB/s'.format(megabytes / compress_time))
+    print('Decompression: {:.2f} MB/s'.format(megabytes / decompress_time))
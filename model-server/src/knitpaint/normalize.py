@@ -1,5 +1,43 @@
+import os
 import numpy as np
 
+# Redundant color numbers and the number they are normalized to
+NORMALIZED_COLOR_NUMBERS = {61: 6, 71: 7, 81: 8, 91: 9}
+
+
+def get_color_number_lut(mapping):
+    """
+    Builds a lookup table with 256 entries that maps every color number to itself unless the mapping defines otherwise
+    :param mapping: dict mapping source color numbers to destination color numbers
+    :return:
+    """
+    lut = np.arange(256, dtype=np.uint8)
+    for src_color_number, dst_color_number in mapping.items():
+        lut[src_color_number] = dst_color_number
+    return lut
+
+
+NORMALIZED_COLOR_NUMBERS_LUT = get_color_number_lut(NORMALIZED_COLOR_NUMBERS)
+
+
+def remap_color_numbers(bitmap_data, mapping):
+    """
+    Replaces color numbers according to the provided mapping in a single vectorized pass. Modifies the data in place.
+
+    :param bitmap_data:
+    Numpy array of color numbers with any shape, e.g. a single bitmap or a stacked batch of bitmaps
+
+    :param mapping:
+    Either a dict mapping source color numbers to destination color numbers or a lookup table with 256 entries
+
+    :return:
+    """
+    lut = get_color_number_lut(mapping) if isinstance(mapping, dict) else np.asarray(mapping)
+    if lut.shape != (256,):
+        raise ValueError('Expected a lookup table with 256 entries')
+    bitmap_data[...] = lut[bitmap_data]
+    return bitmap_data
+
 
 def normalize_color_numbers(dst):
     """
@@ -7,10 +45,7 @@ def normalize_color_numbers(dst):
     :param dst:
     :return:
     """
-    dst.bitmap_data = [6 if c == 61 else c for c in dst.bitmap_data]
-    dst.bitmap_data = [7 if c == 71 else c for c in dst.bitmap_data]
-    dst.bitmap_data = [8 if c == 81 else c for c in dst.bitmap_data]
-    dst.bitmap_data = [9 if c == 91 else c for c in dst.bitmap_data]
+    remap_color_numbers(dst.get_np_bitmap_data(), NORMALIZED_COLOR_NUMBERS_LUT)
     return dst
 
 
@@ -72,6 +107,30 @@ def normalize_bitmap_data(dst, has_option_line=True, option_line='keep'):
     return dst
 
 
+def normalize_bitmap_data_dir(input_dir, has_option_line=True, option_line='keep',
+                              extensions=('.dat', '.lep', '.png', '.jpg', '.bmp')):
+    """
+    Reads all patterns in the provided directory and normalizes their bitmap data. See normalize_bitmap_data for the
+    options. Returns a dict that maps the path of each file to its normalized KnitPaint object.
+
+    :param input_dir:
+    :param has_option_line:
+    :param option_line:
+    :param extensions: File extensions of patterns that should be read
+    :return:
+    """
+    from . import KnitPaint
+    normalized = {}
+    for filename in sorted(os.listdir(input_dir)):
+        if not filename.lower().endswith(tuple(extensions)):
+            continue
+        input_path = os.path.join(input_dir, filename)
+        knitpaint = KnitPaint(input_path)
+        normalize_bitmap_data(knitpaint, has_option_line=has_option_line, option_line=option_line)
+        normalized[input_path] = knitpaint
+    return normalized
+
+
 def _normalize_np_bitmap_data(np_bitmap_data, mode='black'):
     """
     Crops the provided numpy bitmap by finding the black or purple edges and cropping according to them
@@ -79,26 +138,24 @@ def _normalize_np_bitmap_data(np_bitmap_data, mode='black'):
     :param mode: can either be 'black' or 'purple'
     :return:
     """
-    list_bitmap_data = np_bitmap_data.flatten().tolist()
+    if mode == 'black':
+        colored = np_bitmap_data != 0
+    elif mode == 'purple':
+        colored = np_bitmap_data == 20
+    else:
+        raise ValueError('Unknown normalization mode ' + str(mode))
 
     # The top left and bottom right corners will always have a color, so find them
-    first_colored_index = None
-    last_colored_index = None
-    for index, byte in enumerate(list_bitmap_data):
-        if (mode == 'black' and byte != 0) or (mode == 'purple' and byte == 20):
-            last_colored_index = index
-            if first_colored_index is None:
-                first_colored_index = index
-
-    if first_colored_index is None or last_colored_index is None:
+    colored = colored.ravel()
+    if colored.size == 0 or not colored.any():
         raise AssertionError('Normalization failed. Expected to find edges.')
+    first_colored_index = int(np.argmax(colored))
+    last_colored_index = colored.size - 1 - int(np.argmax(colored[::-1]))
 
     # Figure out the dimensions of the sliced image
     current_height, current_width = np_bitmap_data.shape
-    first_colored_x = first_colored_index % current_width
-    first_colored_y = int(first_colored_index / current_width)
-    last_colored_x = last_colored_index % current_width
-    last_colored_y = int(last_colored_index / current_width)
+    first_colored_y, first_colored_x = divmod(first_colored_index, current_width)
+    last_colored_y, last_colored_x = divmod(last_colored_index, current_width)
 
     if mode == 'purple':
         first_colored_x = first_colored_x - 3
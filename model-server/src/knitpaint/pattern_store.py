@@ -0,0 +1,192 @@
+import os
+import struct
+import hashlib
+import numpy as np
+
+# A pattern store file starts with the magic bytes followed by the concatenated bitmap data of all patterns. The index
+# with one record per pattern follows the bitmap data. The footer at the end of the file contains the position of the
+# index, the number of patterns and the number of categories.
+STORE_MAGIC = b'KPSTORE1'
+STORE_FOOTER = struct.Struct('<QQI8s')
+
+
+def get_index_dtype(num_categories):
+    """
+    Returns the dtype of the index records for the provided number of categories
+    :param num_categories:
+    :return:
+    """
+    return np.dtype([
+        ('offset', '<u8'),
+        ('width', '<u4'),
+        ('height', '<u4'),
+        ('content_hash', 'u1', (20,)),
+        ('categories', '<f4', (num_categories,))
+    ])
+
+
+def get_content_hash(bitmap_np):
+    """
+    Returns the SHA-1 digest of the bitmap data and its dimensions
+    :param bitmap_np:
+    :return:
+    """
+    content_hash = hashlib.sha1(struct.pack('<II', bitmap_np.shape[1], bitmap_np.shape[0]))
+    content_hash.update(np.ascontiguousarray(bitmap_np, dtype=np.uint8).tobytes())
+    return np.frombuffer(content_hash.digest(), dtype=np.uint8)
+
+
+class PatternStore:
+    """
+    Stores many patterns in a single file without padding. The bitmap data of all patterns is concatenated and an index
+    holds the offset, dimensions, content hash and category vector of each pattern. Patterns are read from a memory
+    map of the file.
+    """
+
+    def __init__(self, filename, num_categories=0):
+        """
+        Opens the pattern store with the provided filename. A new empty store is created if the file does not exist
+        :param filename:
+        :param num_categories: Length of the category vectors. Only used when a new store is created.
+        """
+        self.filename = filename
+        self._data = None
+
+        if os.path.isfile(filename):
+            with open(filename, 'rb') as file:
+                if file.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                    raise ValueError(filename + ' is not a pattern store')
+                file.seek(-STORE_FOOTER.size, os.SEEK_END)
+                index_offset, count, num_categories, magic = STORE_FOOTER.unpack(file.read(STORE_FOOTER.size))
+                if magic != STORE_MAGIC:
+                    raise ValueError(filename + ' is not a complete pattern store')
+                self.num_categories = num_categories
+                self.data_end = index_offset
+                file.seek(index_offset)
+                index_dtype = get_index_dtype(num_categories)
+                self.index = np.frombuffer(file.read(count * index_dtype.itemsize), dtype=index_dtype).copy()
+        else:
+            self.num_categories = num_categories
+            self.data_end = len(STORE_MAGIC)
+            self.index = np.zeros(0, dtype=get_index_dtype(num_categories))
+            with open(filename, 'wb') as file:
+                file.write(STORE_MAGIC)
+                self._write_index(file)
+
+    def __len__(self):
+        return self.index.shape[0]
+
+    def __getitem__(self, index):
+        """
+        Returns the pattern with the provided index as KnitPaint object
+        :param index:
+        :return:
+        """
+        return self.get(index)
+
+    def __iter__(self):
+        return self.iterate()
+
+    def append(self, knitpaint, categories=None):
+        """
+        Appends a single pattern to the store and returns its index. The index of the store is rewritten, so use extend
+        to append many patterns.
+        :param knitpaint:
+        :param categories:
+        :return:
+        """
+        return self.extend([knitpaint], None if categories is None else [categories])[0]
+
+    def extend(self, knitpaints, categories=None):
+        """
+        Appends multiple patterns to the store. The index is only rewritten once, so this is faster than appending the
+        patterns one by one. Returns the indices of the appended patterns.
+        :param knitpaints: Iterable of KnitPaint objects
+        :param categories: Optional list with one category vector per pattern
+        :return:
+        """
+        knitpaints = list(knitpaints)
+        records = np.zeros(len(knitpaints), dtype=self.index.dtype)
+        if categories is not None:
+            records['categories'] = np.asarray(categories, dtype=np.float32).reshape((len(knitpaints), -1))
+
+        with open(self.filename, 'r+b') as file:
+            file.seek(self.data_end)
+            for i, knitpaint in enumerate(knitpaints):
+                bitmap_np = knitpaint.get_np_bitmap_data()
+                records['offset'][i] = self.data_end
+                records['height'][i], records['width'][i] = bitmap_np.shape
+                records['content_hash'][i] = get_content_hash(bitmap_np)
+                file.write(bitmap_np.tobytes())
+                self.data_end += bitmap_np.size
+            self.index = np.concatenate((self.index, records))
+            self._write_index(file)
+            file.truncate()
+
+        self._data = None
+        return list(range(len(self.index) - len(records), len(self.index)))
+
+    def get(self, index, as_array=False):
+        """
+        Returns the pattern with the provided index
+        :param index:
+        :param as_array: Set to True to return a read only numpy array on the memory map instead of a KnitPaint object
+        :return:
+        """
+        record = self.index[index]
+        width = int(record['width'])
+        height = int(record['height'])
+        offset = int(record['offset'])
+        bitmap_np = self._get_data()[offset:offset + width * height].reshape((height, width))
+        if as_array:
+            return bitmap_np
+        from . import KnitPaint
+        return KnitPaint(bitmap_np)
+
+    def iterate(self, where=None, as_array=False):
+        """
+        Iterates over the patterns of the store. The patterns can be filtered using the index records.
+
+        :param where:
+        Either a boolean mask with one entry per pattern or a function that takes the index records and returns such a
+        mask, e.g. lambda index: index['width'] <= 40
+
+        :param as_array:
+        Set to True to yield numpy arrays instead of KnitPaint objects
+
+        :return:
+        """
+        if where is None:
+            indices = range(len(self))
+        else:
+            mask = where(self.index) if callable(where) else where
+            indices = np.flatnonzero(mask).tolist()
+        for index in indices:
+            yield self.get(index, as_array=as_array)
+
+    def find(self, knitpaint):
+        """
+        Returns the indices of all stored patterns with the same content as the provided pattern
+        :param knitpaint:
+        :return:
+        """
+        content_hash = get_content_hash(knitpaint.get_np_bitmap_data())
+        return np.flatnonzero(np.all(self.index['content_hash'] == content_hash, axis=1)).tolist()
+
+    def _get_data(self):
+        """
+        Returns a memory map of the file. It is recreated after patterns were appended.
+        :return:
+        """
+        if self._data is None:
+            self._data = np.memmap(self.filename, dtype=np.uint8, mode='r')
+        return self._data
+
+    def _write_index(self, file):
+        """
+        Writes the index and the footer to the current position of the file
+        :param file:
+        :return:
+        """
+        file.write(self.index.tobytes())
+        file.write(STORE_FOOTER.pack(self.data_end, len(self.index), self.num_categories, STORE_MAGIC))
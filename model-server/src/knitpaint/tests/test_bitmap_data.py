@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+from .. import KnitPaint
+
+
+def test_np_bitmap_data_storage():
+    """
+    Bitmap data should be stored as contiguous uint8 matrix and be returned without conversion
+    """
+    random = np.random.randint(0, 255, (20, 30))
+    kp_random = KnitPaint(random)
+    np_bitmap_data = kp_random.get_np_bitmap_data()
+    assert np_bitmap_data.dtype == np.uint8
+    assert np_bitmap_data.flags['C_CONTIGUOUS']
+    assert np.array_equal(np_bitmap_data, random)
+    assert kp_random.get_np_bitmap_data() is np_bitmap_data, 'Expected the stored matrix to be returned'
+    assert np.array_equal(kp_random.get_np_bitmap_data(bottom_to_top=True), np.flipud(random))
+
+
+def test_list_bitmap_data():
+    """
+    The list representation should be created on demand and setting it should keep the dimensions
+    """
+    kp = KnitPaint(np.array([[1, 2, 3], [4, 5, 6]]))
+    assert kp.bitmap_data == [1, 2, 3, 4, 5, 6]
+    kp.bitmap_data = [6, 5, 4, 3, 2, 1]
+    assert kp.get_np_bitmap_data().shape == (2, 3)
+    assert np.array_equal(kp.get_np_bitmap_data(), [[6, 5, 4], [3, 2, 1]])
+
+    kp.set_bitmap_data(bytes([1, 2, 3, 4]), 2, 2)
+    assert np.array_equal(kp.get_np_bitmap_data(), [[1, 2], [3, 4]])
+    assert kp.get_width() == 2 and kp.get_height() == 2
+
+
+def test_invalid_bitmap_data():
+    """
+    Bitmap data with color numbers that do not fit into a byte or with the wrong size should be rejected
+    """
+    kp = KnitPaint(np.array([[1, 2], [3, 4]]))
+    for bitmap_data in [[1, 2, 3, 256], [-1, 2, 3, 4], [1, 2, 3], bytes([1, 2, 3])]:
+        with pytest.raises(ValueError):
+            kp.set_bitmap_data(bitmap_data, 2, 2)
+        assert np.array_equal(kp.get_np_bitmap_data(), [[1, 2], [3, 4]])
+    with pytest.raises(ValueError):
+        KnitPaint(np.array([[0, 300]]))
@@ -0,0 +1,88 @@
+import csv
+import json
+import pytest
+import numpy as np
+import cv2
+from .. import KnitPaint
+from ..cli import main
+
+
+def write_samples(input_dir):
+    """
+    Writes a correct pattern, a pattern with a knit error and a file that can not be read into the input directory
+    :param input_dir:
+    :return:
+    """
+    input_dir.mkdir()
+    KnitPaint(np.array([[1, 1], [1, 1]])).write_image(str(input_dir / 'correct.png'), verbose=False)
+    KnitPaint(np.array([[1, 1, 1], [6, 1, 1]])).write_image(str(input_dir / 'incorrect.png'), verbose=False)
+    (input_dir / 'broken.png').write_bytes(b'not an image')
+
+
+def test_check_csv_report(tmp_path):
+    write_samples(tmp_path / 'inputs')
+    report = tmp_path / 'report.csv'
+    assert main(['check', str(tmp_path / 'inputs'), '--report', str(report), '--workers', '1', '--quiet']) == 1
+
+    with open(str(report), newline='') as f:
+        rows = {row['file']: row for row in csv.DictReader(f)}
+    assert len(rows) == 3
+    correct = rows[str(tmp_path / 'inputs' / 'correct.png')]
+    assert correct['result'] == 'ok' and correct['status'] == 'correct'
+    assert (correct['width'], correct['height']) == ('2', '2')
+    incorrect = rows[str(tmp_path / 'inputs' / 'incorrect.png')]
+    assert incorrect['result'] == 'ok' and incorrect['status'] == 'error'
+    assert int(incorrect['errors']) > 0 and incorrect['first_problem'].startswith('TransferOutOfBedError')
+    broken = rows[str(tmp_path / 'inputs' / 'broken.png')]
+    assert broken['result'] == 'failed' and broken['message'] != ''
+
+
+def test_check_jsonl_report(tmp_path):
+    write_samples(tmp_path / 'inputs')
+    report = tmp_path / 'report.jsonl'
+    inputs = str(tmp_path / 'inputs' / 'c*.png')
+    assert main(['check', inputs, '--report', str(report), '--workers', '1', '--quiet', '--as-pattern']) == 0
+
+    with open(str(report)) as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 1
+    assert rows[0]['file'] == str(tmp_path / 'inputs' / 'correct.png')
+    assert rows[0]['result'] == 'ok' and rows[0]['status'] == 'correct'
+    assert rows[0]['errors'] == 0 and rows[0]['first_problem'] is None
+
+
+def test_render(tmp_path):
+    write_samples(tmp_path / 'inputs')
+    (tmp_path / 'inputs' / 'broken.png').unlink()
+    output_dir = tmp_path / 'previews'
+    report = tmp_path / 'report.jsonl'
+    assert main(['render', str(tmp_path / 'inputs'), '--output-dir', str(output_dir), '--format', 'bmp',
+                 '--scale', '3', '--report', str(report), '--workers', '1', '--quiet']) == 0
+
+    with open(str(report)) as f:
+        rows = sorted((json.loads(line) for line in f), key=lambda row: row['file'])
+    assert [row['output'] for row in rows] == [str(output_dir / 'correct.bmp'), str(output_dir / 'incorrect.bmp')]
+    assert sorted(path.name for path in output_dir.iterdir()) == ['correct.bmp', 'incorrect.bmp']
+    assert cv2.imread(str(output_dir / 'incorrect.bmp')).shape[:2] == (6, 9)
+
+
+def test_same_names_in_different_directories(tmp_path):
+    for directory, color_number in [('a', 1), ('b', 2)]:
+        (tmp_path / 'inputs' / directory).mkdir(parents=True)
+        KnitPaint(np.full((2, 2), color_number)).write_image(str(tmp_path / 'inputs' / directory / 'x.png'),
+                                                             verbose=False)
+    output_dir = tmp_path / 'outputs'
+    inputs = [str(tmp_path / 'inputs' / 'a'), str(tmp_path / 'inputs' / 'b')]
+    assert main(['convert', *inputs, '--output-dir', str(output_dir), '--format', 'bmp',
+                 '--report', str(tmp_path / 'report.jsonl'), '--workers', '1', '--quiet']) == 0
+    assert np.array_equal(KnitPaint(str(output_dir / 'a' / 'x.bmp')).get_np_bitmap_data(), np.full((2, 2), 1))
+    assert np.array_equal(KnitPaint(str(output_dir / 'b' / 'x.bmp')).get_np_bitmap_data(), np.full((2, 2), 2))
+
+
+def test_duplicate_outputs_are_rejected(tmp_path):
+    write_samples(tmp_path / 'inputs')
+    KnitPaint(np.array([[1, 1], [1, 1]])).write_image(str(tmp_path / 'inputs' / 'correct.bmp'), verbose=False)
+    output_dir = tmp_path / 'outputs'
+    with pytest.raises(SystemExit):
+        main(['convert', str(tmp_path / 'inputs'), '--output-dir', str(output_dir), '--workers', '1', '--quiet'])
+    assert not output_dir.exists()
@@ -0,0 +1,18 @@
+import os
+import sys
+import subprocess
+
+
+def test_import_without_heavy_dependencies():
+    """
+    Importing the package should not load OpenCV or TensorFlow, so worker processes that only check patterns start
+    quickly
+    """
+    code = 'import sys\n' \
+           'import knitpaint\n' \
+           'print("cv2" in sys.modules, "tensorflow" in sys.modules)'
+    src_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=src_dir)
+    cv2_imported, tensorflow_imported = output.decode().split()
+    assert cv2_imported == 'False', 'Expected OpenCV not to be imported with the package'
+    assert tensorflow_imported == 'False', 'Expected TensorFlow not to be imported with the package'
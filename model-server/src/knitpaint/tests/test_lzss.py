@@ -0,0 +1,47 @@
+import numpy as np
+from .. import lzss_compress, lzss_decompress, LZSSEncoder, LZSSDecoder
+from ..lzss import LZSS_N, LZSS_F, LZSS_HASH_SIZE
+
+
+def test_lzss_decode_reference():
+    """
+    A hand crafted stream with three literals and an overlapping reference to the start of the ring buffer
+    """
+    compressed = bytes([0x07, ord('A'), ord('B'), ord('C'), 0xee, 0xf3])
+    assert lzss_decompress(compressed) == b'ABCABCABC'
+
+
+def test_lzss_round_trip():
+    """
+    Compressing and decompressing should restore the data, both at once and in chunks of random sizes
+    """
+    data = np.ones(20000, dtype=np.uint8)
+    data[np.random.randint(0, data.size, 2000)] = np.random.randint(0, 255, 2000)
+    data = data.tobytes() + np.random.randint(0, 255, 5000, dtype=np.uint8).tobytes()
+
+    compressed = lzss_compress(data)
+    assert len(compressed) < len(data)
+    assert lzss_decompress(compressed) == data
+
+    encoder = LZSSEncoder()
+    decoder = LZSSDecoder()
+    decompressed = b''
+    position = 0
+    while position < len(data):
+        size = np.random.randint(1, 3000)
+        decompressed += decoder.feed(encoder.feed(data[position:position + size]))
+        position += size
+    decompressed += decoder.feed(encoder.flush())
+    assert decompressed == data
+
+
+def test_lzss_encoder_memory_is_bounded():
+    """
+    The encoder should only keep the history that can still be referenced, regardless of the size of the input
+    """
+    data = np.random.randint(0, 3, 5 * LZSS_N, dtype=np.uint8).tobytes()
+    encoder = LZSSEncoder()
+    compressed = encoder.feed(data)
+    assert len(encoder.buffer) <= LZSS_N + LZSS_F
+    assert len(encoder.head) == LZSS_HASH_SIZE and len(encoder.prev) == LZSS_N
+    assert lzss_decompress(compressed + encoder.flush()) == data
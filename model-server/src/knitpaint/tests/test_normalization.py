@@ -1,5 +1,5 @@
 import numpy as np
-from .. import KnitPaint
+from .. import KnitPaint, remap_color_numbers, normalize_bitmap_data_dir
 
 
 def test_cropping():
@@ -25,3 +25,29 @@ def test_default_option_line():
 
     assert np.array_equal(normalized[3:-3, 45:-45], random), 'Expected pattern not to be changed'
     assert normalized.shape == (106, 190), 'Expected option line to have correct shape'
+
+
+def test_normalize_color_numbers():
+    kp = KnitPaint(np.array([[61, 71, 1], [81, 91, 6]]))
+    kp.normalize_color_numbers()
+    assert np.array_equal(kp.get_np_bitmap_data(), [[6, 7, 1], [8, 9, 6]])
+
+
+def test_remap_color_numbers():
+    # Arbitrary mappings should work on a stacked batch of patterns
+    batch = np.random.randint(1, 3, (4, 10, 10))
+    expected = np.where(batch == 1, 2, 1)
+    remap_color_numbers(batch, {1: 2, 2: 1})
+    assert np.array_equal(batch, expected), 'Expected batch to be remapped in place'
+
+
+def test_normalize_directory(tmp_path):
+    # Write a few padded patterns as images and normalize the whole directory at once
+    patterns = [np.random.randint(1, 50, (10, 12)) for _ in range(3)]
+    for i, pattern in enumerate(patterns):
+        KnitPaint(np.pad(pattern, 5, 'constant')).write_image(str(tmp_path / ('pattern-' + str(i) + '.png')), False)
+    normalized = normalize_bitmap_data_dir(str(tmp_path), has_option_line=False, option_line='remove')
+    assert len(normalized) == len(patterns)
+    for i, pattern in enumerate(patterns):
+        knitpaint = normalized[str(tmp_path / ('pattern-' + str(i) + '.png'))]
+        assert np.array_equal(knitpaint.get_np_bitmap_data()[3:-3, 3:-3], pattern)
@@ -0,0 +1,35 @@
+import numpy as np
+from .. import KnitPaint, PatternStore
+
+
+def test_pattern_store(tmp_path):
+    """
+    Appends random patterns of different sizes to a store and checks if they can be read again after reopening it
+    """
+    patterns = [np.random.randint(0, 255, np.random.randint(1, 30, 2)) for _ in range(20)]
+    categories = np.random.rand(20, 5)
+    store_filename = str(tmp_path / 'patterns.kps')
+
+    store = PatternStore(store_filename, num_categories=5)
+    store.append(KnitPaint(patterns[0]), categories[0])
+    store.extend([KnitPaint(p) for p in patterns[1:]], categories[1:])
+    assert len(store) == len(patterns)
+    assert store[0] == KnitPaint(patterns[0])
+
+    # Reopen the store and read all patterns
+    store = PatternStore(store_filename)
+    assert len(store) == len(patterns)
+    assert np.allclose(store.index['categories'], categories)
+    for pattern, stored_pattern in zip(patterns, store.iterate(as_array=True)):
+        assert np.array_equal(pattern, stored_pattern)
+    assert store.find(KnitPaint(patterns[7]))[0] == 7
+
+
+def test_pattern_store_filter(tmp_path):
+    """
+    Filtered iteration should only return the matching patterns
+    """
+    store = PatternStore(str(tmp_path / 'patterns.kps'))
+    store.extend([KnitPaint(np.ones((i, i), dtype=int)) for i in range(1, 11)])
+    narrow = list(store.iterate(lambda index: index['width'] <= 4))
+    assert [kp.get_width() for kp in narrow] == [1, 2, 3, 4]
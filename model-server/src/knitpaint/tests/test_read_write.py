@@ -1,7 +1,12 @@
+import pytest
 import numpy as np
+import cv2
 from .. import KnitPaint
 from .. import read_dat
 from .. import read_image
+from .. import read_linebreak, read_linebreak_corpus, write_linebreak_corpus, LinebreakCorpus
+from ..constants import default_color_table
+from ..image_reader import get_color_lookup
 
 
 def test_dat_read_write(tmp_path):
@@ -31,3 +36,98 @@ def test_image_read_write(tmp_path):
     kp_random.write_image(str(tmp_path / 'test.png'))
     kp_image = read_image(str(tmp_path / 'test.png'))
     assert kp_image == kp_random, 'Expected KnitPaint read from disk to equal the one generated before'
+
+
+def test_nearest_color_lookup():
+    """
+    Colors that are not part of the color table should be resolved to the nearest color number
+    """
+    color_table = default_color_table
+    lookup = get_color_lookup(color_table)
+    colors = np.clip(np.array(color_table[:50]) + np.random.randint(-2, 3, (50, 3)), 0, 255)
+    expected = [int(np.argmin(np.linalg.norm(np.array(color_table) - color, axis=1))) for color in colors]
+    assert lookup.lookup(colors).tolist() == expected
+    assert get_color_lookup(color_table) is lookup, 'Expected lookup to be cached for the same color table'
+
+
+def test_render_image():
+    """
+    Rendered images should be scaled and encoded in memory
+    """
+    random = np.random.randint(0, 50, (10, 20))
+    kp_random = KnitPaint(random)
+    image = kp_random.render_image(scale=3)
+    assert image.shape == (30, 60, 3)
+    assert image.dtype == np.uint8
+    assert np.array_equal(image[::3, ::3], np.array(default_color_table)[np.flipud(random)])
+
+    encoded = kp_random.render_image('png', scale=3)
+    decoded = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert np.array_equal(decoded[:, :, ::-1], image)
+
+
+def test_linebreak_read_write():
+    """
+    Writes a random knitpaint with linebreaks and checks if reading the result from bytes, memoryview or list restores
+    the same bitmap data
+    """
+    random = np.random.randint(1, 150, (20, 30))
+    kp_random = KnitPaint(random)
+    linebreak_bytes = kp_random.write_linebreak(linebreak_char=151)
+    for linebreak_input in [bytes(linebreak_bytes), memoryview(linebreak_bytes), list(linebreak_bytes)]:
+        kp_linebreak = read_linebreak(linebreak_input, 151)
+        assert np.array_equal(kp_linebreak.get_np_bitmap_data(), random)
+
+
+def test_linebreak_padding():
+    """
+    Lines with different lengths should be padded and cropped to the target dimensions
+    """
+    kp = read_linebreak([3, 3, 3, 151, 4, 151, 5, 5], 151, padding_char=1)
+    assert np.array_equal(kp.get_np_bitmap_data(), [[3, 3, 3], [4, 1, 1], [5, 5, 1]])
+    kp = read_linebreak([3, 3, 3, 151, 4, 151, 5, 5], 151, padding_char=1, target_width=2, target_height=4)
+    assert np.array_equal(kp.get_np_bitmap_data(), [[3, 3], [4, 1], [5, 5], [1, 1]])
+
+
+def test_linebreak_corpus_read_write(tmp_path):
+    """
+    Writes multiple random patterns into a corpus and checks if streaming and random access return the same patterns
+    """
+    patterns = [np.random.randint(1, 150, np.random.randint(1, 20, 2)) for _ in range(10)]
+    corpus_filename = str(tmp_path / 'corpus.bin')
+    write_linebreak_corpus([KnitPaint(p) for p in patterns], corpus_filename, 150, 151, 152, verbose=False)
+
+    streamed = list(read_linebreak_corpus(corpus_filename, 150, 151, 152, as_array=True))
+    assert len(streamed) == len(patterns)
+    for pattern, streamed_pattern in zip(patterns, streamed):
+        assert np.array_equal(pattern, streamed_pattern)
+
+    corpus = LinebreakCorpus(corpus_filename, 150, 151, 152)
+    assert len(corpus) == len(patterns)
+    assert np.array_equal(corpus[3].get_np_bitmap_data(), patterns[3])
+    assert np.array_equal(corpus.get(7, as_array=True), patterns[7])
+
+
+def test_lazy_image_read(tmp_path):
+    """
+    Lazily read images should provide their dimensions before the bitmap data is decoded
+    """
+    random = np.random.randint(0, 50, (30, 40))
+    kp_random = KnitPaint(random)
+    for extension in ['png', 'bmp', 'jpg']:
+        kp_random.write_image(str(tmp_path / ('test.' + extension)), verbose=False)
+        kp_lazy = KnitPaint(str(tmp_path / ('test.' + extension)), lazy=True)
+        assert kp_lazy.get_width() == 40 and kp_lazy.get_height() == 30
+        assert kp_lazy._bitmap is None, 'Expected bitmap data not to be decoded yet'
+        assert kp_lazy.get_np_bitmap_data().shape == (30, 40)
+        if extension != 'jpg':
+            assert kp_lazy == kp_random
+
+
+def test_lazy_read_rejects_dat_and_lep():
+    """
+    Only images can be read lazily, dat and lep files should be rejected before they are read
+    """
+    for input_file in ['missing.dat', 'missing.LEP', b'SDS LZSS COMPRESS Ver 1.00']:
+        with pytest.raises(ValueError):
+            KnitPaint(input_file, lazy=True)
@@ -3,26 +3,25 @@ import pathlib
 import sys
 import heapq
 import math
+import time
+import multiprocessing
 
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
 
 from knitpaint import KnitPaint
 from knitpaint import read_linebreak
-from knitpaint.check import KnitPaintCheckException, NumberOfLoopsInNeedleWarning, TransferWithOverlappedLoopsWarning,\
-    TransferOfPickupStitchWarning
-from train_utils import masked_acc, split_train_val, fit_and_log, get_lstm_layer, TemperatureScaling, StochasticSampling
-
-K = keras.backend
-Model = keras.Model
-Input = keras.layers.Input
-Embedding = keras.layers.Embedding
-Lambda = keras.layers.Lambda
-concatenate = keras.layers.concatenate
-Dense = keras.layers.Dense
-Softmax = keras.layers.Softmax
+from knitpaint import PatternStore
+from knitpaint.check import check_many, KnitPaintCheckError, NumberOfLoopsInNeedleWarning, \
+    TransferWithOverlappedLoopsWarning, TransferOfPickupStitchWarning
+from knitpaint.check.batch import PROBLEM_NAMES
+
+# TensorFlow, Keras and the training utilities are imported on first use by import_model_dependencies, since importing
+# them takes multiple seconds
+tf = keras = K = Model = Input = Embedding = Lambda = concatenate = Dense = Softmax = None
+masked_acc = split_train_val = fit_and_log = get_lstm_layer = TemperatureScaling = StochasticSampling = None
+
+# Durations of the steps performed during startup in seconds
+STARTUP_TIMES = {}
 
 PADDING_CHAR = 0
 BG_CHAR = 1
@@ -34,6 +33,39 @@ CATEGORIES = ['Cable/Aran', 'Stitch move', 'Links', 'Miss', 'Tuck']
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
 
+def import_model_dependencies():
+    """
+    Imports TensorFlow, Keras and the training utilities if they were not imported before. Commands that do not need
+    the model therefore do not have to wait for TensorFlow to initialize.
+    :return:
+    """
+    global tf, keras, K, Model, Input, Embedding, Lambda, concatenate, Dense, Softmax
+    global masked_acc, split_train_val, fit_and_log, get_lstm_layer, TemperatureScaling, StochasticSampling
+    if tf is not None:
+        return
+
+    start = time.perf_counter()
+    import tensorflow
+    import train_utils
+    tf = tensorflow
+    keras = tensorflow.keras
+    K = keras.backend
+    Model = keras.Model
+    Input = keras.layers.Input
+    Embedding = keras.layers.Embedding
+    Lambda = keras.layers.Lambda
+    concatenate = keras.layers.concatenate
+    Dense = keras.layers.Dense
+    Softmax = keras.layers.Softmax
+    masked_acc = train_utils.masked_acc
+    split_train_val = train_utils.split_train_val
+    fit_and_log = train_utils.fit_and_log
+    get_lstm_layer = train_utils.get_lstm_layer
+    TemperatureScaling = train_utils.TemperatureScaling
+    StochasticSampling = train_utils.StochasticSampling
+    STARTUP_TIMES['import_tensorflow'] = time.perf_counter() - start
+
+
 class LSTMModel:
     """
     Uses knit patterns from the library to train an lstm
@@ -53,6 +85,7 @@ class LSTMModel:
         :return:
         """
         # Read patterns
+        import pandas as pd
         df = pd.DataFrame(pd.read_json(self.data_dir + 'staf-details-training.json'))
 
         # Find max sequence length
@@ -67,13 +100,17 @@ class LSTMModel:
         # The sum of each row will be 1
         categories = np.zeros((df.shape[0], len(CATEGORIES)), dtype=float)
 
+        # Additionally collect the unpadded patterns to store them in a pattern store
+        patterns = []
+
         print('\n\nReading Input Files...')
         for i, (_, row) in enumerate(df.iterrows()):
             apex_file = self.data_dir + row['apex_file']
             knitpaint = KnitPaint(apex_file)
             knitpaint.normalize_color_numbers()
+            patterns.append(KnitPaint(knitpaint.get_np_bitmap_data()))
             knitpaint.add_char_col(END_OF_LINE_CHAR)
-            sequence = np.array(knitpaint.bitmap_data)
+            sequence = knitpaint.get_np_bitmap_data().ravel()
             sequence = np.array([START_OF_FILE_CHAR, *sequence, END_OF_FILE_CHAR])
             sequences[i, :sequence.size] = sequence
             for j, category in enumerate(CATEGORIES):
@@ -83,6 +120,14 @@ class LSTMModel:
         categories_row_sums = categories.sum(axis=1)
         categories = categories / categories_row_sums[:, np.newaxis]
 
+        # Store all patterns at once with the same categories as the training sequences
+        pathlib.Path(self.training_dir).mkdir(parents=True, exist_ok=True)
+        store_filename = self.training_dir + 'training-patterns.kps'
+        if os.path.isfile(store_filename):
+            os.remove(store_filename)
+        store = PatternStore(store_filename, num_categories=len(CATEGORIES))
+        store.extend(patterns, categories)
+
         # Find and print some category statistics
         unique_categories, unique_categories_counts = np.unique(categories, axis=0, return_counts=True)
         unique_categories_counts = np.expand_dims(unique_categories_counts, axis=1)
@@ -157,6 +202,8 @@ class LSTMModel:
         return input_data, output_data, weights, vocab_size, from_idx, to_idx
 
     def _get_model_input(self, vocab_size, batch_size):
+        import_model_dependencies()
+
         # Build a one hot encoding on the fly. Use one hot instead of embedding since the vocab_size is small
         sequence_input = Input(batch_shape=(batch_size, None), name='sequence_inputs_layer', dtype='int32')
         embedded_input = Lambda(lambda x: K.one_hot(x, vocab_size), name='one_hot_inputs')(sequence_input)
@@ -172,6 +219,8 @@ class LSTMModel:
         return sequence_input, category_input, concatenated_inputs
 
     def get_train_model(self, vocab_size, batch_size=None):
+        import_model_dependencies()
+
         # Get concatenated inputs
         sequence_input, category_input, concatenated_inputs = self._get_model_input(vocab_size, batch_size)
 
@@ -201,6 +250,8 @@ class LSTMModel:
         return Model(inputs=inputs, outputs=outputs)
 
     def get_sample_model(self, vocab_size, batch_size=None):
+        import_model_dependencies()
+
         # Get concatenated inputs
         sequence_input, category_input, concatenated_inputs = self._get_model_input(vocab_size, batch_size)
 
@@ -259,6 +310,8 @@ class LSTMModel:
         :param val_split:
         :return:
         """
+        import_model_dependencies()
+
         # Read input and output data
         input_data, output_data, weights, vocab_size, _, to_idx = self.read_training_dataset()
         output_data = tf.keras.utils.to_categorical(output_data, vocab_size)
@@ -293,6 +346,7 @@ class LSTMModel:
         :return:
         """
         # Get a reference to the default tensorflow graph
+        import_model_dependencies()
         graph = tf.get_default_graph()
 
         # Load the vocabulary
@@ -422,6 +476,7 @@ class LSTMModel:
         stores the resulting evaluation
         :return:
         """
+        import pandas as pd
         sample = self.sample()
         evaluation = []
 
@@ -473,61 +528,62 @@ class LSTMModel:
         progress = tf.keras.utils.Progbar(len(sampling_configurations) * len(category_weights_values) * num_samples)
         progress_counter = 0
 
-        for sampling_configuration in sampling_configurations:
-            method = sampling_configuration['method']
-            temperature = sampling_configuration['temperature']
-            for i, category_weights in enumerate(category_weights_values):
-                # Keep a set of hashes of previously sampled knitpaint
-                previous = set()
-
-                # Sample some knitpaint
-                for _ in range(num_samples):
-
-                    # Sample and create knitpaint object from result
-                    generated_res = []
-                    for s in sample([START_OF_FILE_CHAR], category_weights, method, temperature, 5, True, 0, 400):
-                        generated_res = generated_res + s
-                    knitpaint = read_linebreak(generated_res[1:-1], END_OF_LINE_CHAR, padding_char=1)
-                    knitpaint_hash = hash(bytes(knitpaint.bitmap_data))
-
-                    # Check if the data is knittable
-                    no_problems = True
-                    knittable = True
-                    try:
-                        knitpaint.check_as_pattern()
-                    except KnitPaintCheckException as e:
-                        no_problems = False
-                        relevant_problems = [p for p in e.problems if not (
-                                               isinstance(p, NumberOfLoopsInNeedleWarning)
-                                               or isinstance(p, TransferOfPickupStitchWarning)
-                                               or isinstance(p, TransferWithOverlappedLoopsWarning)
-                                             )]
-                        knittable = len(relevant_problems) == 0
-                    except (AttributeError, ZeroDivisionError, NotImplementedError):
-                        knittable = False
-                        no_problems = False
-
-                    # Append to result list
-                    evaluation.append({
-                        'method': method,
-                        'temperature': temperature,
-                        'category_weights_value': category_weights,
-                        'category_weights_name': category_weights_names[i],
-                        'category_weights_train_count': category_weights_train_counts[i],
-                        'no_problems': no_problems,
-                        'knittable': knittable,
-                        'unique': knitpaint_hash not in previous,
-                        'width': knitpaint.get_width(),
-                        'height': knitpaint.get_height(),
-                        'area': len(knitpaint.bitmap_data)
-                    })
-
-                    # Add to set of previous knitpaint
-                    previous.add(knitpaint_hash)
-
-                    # Log progress
-                    progress_counter += 1
-                    progress.update(progress_counter)
+        # The samples are checked by a pool of workers that is shared by all configurations. The workers are spawned,
+        # since forking after TensorFlow started its threads can deadlock them.
+        with multiprocessing.get_context('spawn').Pool() as check_pool:
+            for sampling_configuration in sampling_configurations:
+                method = sampling_configuration['method']
+                temperature = sampling_configuration['temperature']
+                for i, category_weights in enumerate(category_weights_values):
+                    # Keep a set of hashes of previously sampled knitpaint
+                    previous = set()
+
+                    # Sample some knitpaint
+                    knitpaints = []
+                    for _ in range(num_samples):
+
+                        # Sample and create knitpaint object from result
+                        generated_res = []
+                        for s in sample([START_OF_FILE_CHAR], category_weights, method, temperature, 5, True, 0, 400):
+                            generated_res = generated_res + s
+                        knitpaints.append(read_linebreak(generated_res[1:-1], END_OF_LINE_CHAR, padding_char=1))
+
+                        # Log progress
+                        progress_counter += 1
+                        progress.update(progress_counter)
+
+                    # Check if the data is knittable. The samples are checked in parallel and each check stops at the
+                    # first error, since a single error already makes the sample not knittable. Some warnings are
+                    # accepted.
+                    results = check_many(knitpaints, mode='pattern', stop_at=KnitPaintCheckError, pool=check_pool)
+                    accepted_warnings = [NumberOfLoopsInNeedleWarning.__name__, TransferOfPickupStitchWarning.__name__,
+                                         TransferWithOverlappedLoopsWarning.__name__]
+                    relevant_problem_names = [name for name in PROBLEM_NAMES if name not in accepted_warnings]
+
+                    for j, knitpaint in enumerate(knitpaints):
+                        knitpaint_hash = hash(knitpaint.get_np_bitmap_data().tobytes())
+                        status = results['status'][j]
+                        no_problems = status == 'correct'
+                        knittable = status not in ('not_implemented', 'failed') and \
+                            sum(results[name][j] for name in relevant_problem_names) == 0
+
+                        # Append to result list
+                        evaluation.append({
+                            'method': method,
+                            'temperature': temperature,
+                            'category_weights_value': category_weights,
+                            'category_weights_name': category_weights_names[i],
+                            'category_weights_train_count': category_weights_train_counts[i],
+                            'no_problems': no_problems,
+                            'knittable': knittable,
+                            'unique': knitpaint_hash not in previous,
+                            'width': knitpaint.get_width(),
+                            'height': knitpaint.get_height(),
+                            'area': knitpaint.get_np_bitmap_data().size
+                        })
+
+                        # Add to set of previous knitpaint
+                        previous.add(knitpaint_hash)
 
         # Convert evaluation to data frame and save it
         df = pd.DataFrame(evaluation)
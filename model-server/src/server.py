@@ -1,12 +1,14 @@
-import os, logging, base64, datetime, pathlib
+import os, logging, base64, datetime, pathlib, time, threading
+startup_start = time.perf_counter()
 from functools import reduce
 from uuid import UUID
 from flask import Flask, Response, request, json
 from flask_cors import CORS
-from lstm import LSTMModel, START_OF_FILE_CHAR, END_OF_LINE_CHAR
+from lstm import LSTMModel, START_OF_FILE_CHAR, END_OF_LINE_CHAR, STARTUP_TIMES
 from knitpaint import KnitPaint, KnitPaintCheckException
 from knitpaint.check import KnitPaintCheckSyntaxError, KnitPaintCheckError, KnitPaintCheckWarning
 import knitpaint
+from thumbnail_cache import ThumbnailCache
 
 # Create flask app that allows to sample from previously trained models
 app = Flask(__name__, static_url_path='', static_folder='../static')
@@ -17,9 +19,36 @@ cors = CORS(app)
 os.environ["CUDA_DEVICE_ORDER"] = "PCI_BUS_ID"
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
 
-# Initialize model
+# Initialize the model in the background, so static files and conversions can be served while TensorFlow initializes
+STARTUP_TIMES['import_server'] = time.perf_counter() - startup_start
 lstm_model = LSTMModel()
-sample_lstm = lstm_model.sample()
+sample_lstm = None
+sample_lstm_loaded = threading.Event()
+
+
+def load_sample_lstm():
+    """
+    Loads the model for sampling and logs how long the startup took
+    :return:
+    """
+    global sample_lstm
+    start = time.perf_counter()
+    try:
+        sample_lstm = lstm_model.sample()
+        STARTUP_TIMES['load_model'] = time.perf_counter() - start - STARTUP_TIMES.get('import_tensorflow', 0)
+    finally:
+        sample_lstm_loaded.set()
+    app.logger.info('Startup times: ' + ', '.join(['{}: {:.2f}s'.format(k, v) for k, v in STARTUP_TIMES.items()]))
+
+
+threading.Thread(target=load_sample_lstm, daemon=True).start()
+
+# Cache for rendered thumbnails
+thumbnail_cache = ThumbnailCache()
+THUMBNAIL_FORMATS = {'png': 'image/png', 'jpg': 'image/jpeg', 'bmp': 'image/bmp'}
+THUMBNAIL_JPEG_QUALITIES = {1: 50, 2: 75, 3: 95}
+THUMBNAIL_MAX_RESOLUTION = 2000
+THUMBNAIL_MAX_DATA_LENGTH = 1024 * 1024
 
 
 @app.route('/', methods=['GET'], defaults={'path': ''})
@@ -47,6 +76,17 @@ def set_cache_headers(resp):
     resp.headers['Expires'] = '0'
 
 
+def bad_request(message):
+    """
+    Creates a response for an invalid request
+    :param message:
+    :return:
+    """
+    resp = Response(json.dumps({'error': message}), status=400, mimetype='application/json')
+    set_cache_headers(resp)
+    return resp
+
+
 @app.route('/api/*', methods=['OPTIONS'])
 def send_cors_options():
     """
@@ -58,6 +98,20 @@ def send_cors_options():
     return resp
 
 
+@app.route('/api/status', methods=['GET'])
+def status():
+    """
+    Reports if the model is loaded and how long the steps of the startup took. Can be used as health check.
+    :return:
+    """
+    resp = Response(json.dumps({
+        'model_loaded': sample_lstm is not None,
+        'startup_times': STARTUP_TIMES
+    }), mimetype='application/json')
+    set_cache_headers(resp)
+    return resp
+
+
 @app.route('/api/from-dat', methods=['POST'])
 def from_dat():
     """
@@ -77,7 +131,7 @@ def to_dat():
     Converts the provided knitpaint data to a dat file and streams back the file
     :return:
     """
-    data = [0]
+    data = bytes([0])
     width = 57
 
     # Try to read options from JSON
@@ -89,7 +143,7 @@ def to_dat():
 
     # Make sure the length of the data matches the width
     if len(data) % width != 0:
-        data += [0] * (width - len(data) % width)
+        data += bytes(width - len(data) % width)
 
     # Use KnitpaintFileHandler to generate the dat file
     height = len(data) // width
@@ -101,6 +155,71 @@ def to_dat():
     return resp
 
 
+def read_thumbnail_options(options):
+    """
+    Reads and validates the options of a thumbnail request. Raises a ValueError or TypeError if an option is invalid.
+    :param options:
+    :return: Tuple of the data, width, format, resolution, quality and color
+    """
+    if not isinstance(options, dict):
+        raise ValueError('Expected a JSON object')
+    data = bytes([0])
+    width = 1
+    if 'data' in options:
+        data = base64.b64decode(options['data'], validate=True)
+    if len(data) == 0:
+        raise ValueError('Expected non-empty data')
+    if 'width' in options:
+        width = max(1, int(options['width']))
+    if len(data) > THUMBNAIL_MAX_DATA_LENGTH or width > THUMBNAIL_MAX_DATA_LENGTH:
+        raise ValueError('Expected at most {} stitches'.format(THUMBNAIL_MAX_DATA_LENGTH))
+    image_format = 'png' if options.get('format') not in THUMBNAIL_FORMATS else options['format']
+    resolution = 0 if options.get('resolution') is None else int(options['resolution'])
+    resolution = max(0, min(THUMBNAIL_MAX_RESOLUTION, resolution))
+    quality = 3 if options.get('quality') not in THUMBNAIL_JPEG_QUALITIES else options['quality']
+    color = None if options.get('color') is None else [int(c) for c in options['color']]
+    if color is not None and (len(color) != 3 or not all(0 <= c <= 255 for c in color)):
+        raise ValueError('Expected color as three numbers from 0 to 255')
+    return data, width, image_format, resolution, quality, color
+
+
+@app.route('/api/thumbnail', methods=['POST'])
+def thumbnail():
+    """
+    Renders a preview image of the provided knitpaint data and streams back the image. The optional color tints the
+    image like the color of the yarn. Rendered images are cached by their content and options, so repeated requests do
+    not need to be rendered again.
+    :return:
+    """
+    # Read options from JSON
+    try:
+        data, width, image_format, resolution, quality, color = read_thumbnail_options(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return bad_request(str(e))
+
+    # Make sure the length of the data matches the width
+    if len(data) % width != 0:
+        data += bytes(width - len(data) % width)
+
+    def render():
+        # Scale the image so that its longer side is at least as long as the requested resolution
+        height = len(data) // width
+        scale = max(1, -(-resolution // max(width, height)))
+        handler = KnitPaint()
+        handler.set_bitmap_data(data, width, height)
+        if color is not None:
+            handler.color_table = [[value * c // 255 for value, c in zip(rgb, color)] for rgb in handler.color_table]
+        jpeg_quality = THUMBNAIL_JPEG_QUALITIES[quality] if image_format == 'jpg' else None
+        return handler.render_image(image_format, scale=scale, quality=jpeg_quality)
+
+    key = thumbnail_cache.get_key(data, width, format=image_format, resolution=resolution, quality=quality,
+                                  color=color)
+    image_bytes = thumbnail_cache.get_or_render(key, render)
+    resp = Response(image_bytes, mimetype=THUMBNAIL_FORMATS[image_format])
+    set_cache_headers(resp)
+    return resp
+
+
 @app.route('/api/pattern', methods=['POST'])
 def get_pattern():
     # Read and sanitize options
@@ -127,7 +246,12 @@ def get_pattern():
     max_generate = 400 if 'maxGenerate' not in options else int(options['maxGenerate'])
     max_generate = max(1, min(1000, max_generate))
 
-    # Sample from lstm staf model. Start with start character
+    # Sample from lstm staf model. Start with start character. Wait for the model if it is still loading.
+    sample_lstm_loaded.wait()
+    if sample_lstm is None:
+        resp = Response(json.dumps({'error': 'Model could not be loaded'}), status=503, mimetype='application/json')
+        set_cache_headers(resp)
+        return resp
     start_seq = [START_OF_FILE_CHAR]
     sample = sample_lstm(start_seq, category_weights=category_weights, method=method, temperature=temperature, k=k,
                          length_normalization=length_normalization, length_bonus_factor=length_bonus_factor,
@@ -166,7 +290,7 @@ def get_pattern():
 
 def knitpaint_to_dict(handler):
     return {
-        'data': base64.b64encode(bytes(handler.bitmap_data)).decode(),
+        'data': base64.b64encode(handler.get_np_bitmap_data().tobytes()).decode(),
         'width': handler.get_width()
     }
 
@@ -0,0 +1,39 @@
+import os
+import sys
+import subprocess
+import pytest
+
+
+def run_in_src_dir(code):
+    """
+    Helper method to run code in a new interpreter, so modules imported by other tests are not loaded yet
+    :param code:
+    :return:
+    """
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.check_output([sys.executable, '-c', code], cwd=src_dir).decode().split()
+
+
+def test_import_without_tensorflow():
+    """
+    Importing the lstm module should not load TensorFlow, so commands that do not need the model start quickly
+    """
+    code = 'import sys\n' \
+           'import lstm\n' \
+           'print("tensorflow" in sys.modules, lstm.tf is None, lstm.Dense is None)'
+    tensorflow_imported, tf_unset, dense_unset = run_in_src_dir(code)
+    assert tensorflow_imported == 'False', 'Expected TensorFlow not to be imported with the lstm module'
+    assert tf_unset == 'True' and dense_unset == 'True'
+
+
+def test_import_model_dependencies():
+    """
+    Importing the model dependencies should fill in the module globals used by the model
+    """
+    pytest.importorskip('tensorflow')
+    code = 'import sys\n' \
+           'import lstm\n' \
+           'lstm.import_model_dependencies()\n' \
+           'print(lstm.tf is sys.modules["tensorflow"], lstm.Dense is lstm.tf.keras.layers.Dense,\n' \
+           '      lstm.masked_acc is sys.modules["train_utils"].masked_acc, "import_tensorflow" in lstm.STARTUP_TIMES)'
+    assert run_in_src_dir(code) == ['True'] * 4
@@ -0,0 +1,89 @@
+import base64
+import pytest
+import numpy as np
+import cv2
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+import server
+from thumbnail_cache import ThumbnailCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Provides a test client of the server with an empty thumbnail cache and counts the rendered images
+    """
+    monkeypatch.setattr(server, 'thumbnail_cache', ThumbnailCache())
+    render_image = server.KnitPaint.render_image
+
+    def counting_render_image(self, *args, **kwargs):
+        counting_render_image.calls += 1
+        return render_image(self, *args, **kwargs)
+    counting_render_image.calls = 0
+    monkeypatch.setattr(server.KnitPaint, 'render_image', counting_render_image)
+    client = server.app.test_client()
+    client.render_calls = lambda: counting_render_image.calls
+    return client
+
+
+def make_options(**options):
+    """
+    Helper method to build the options of a thumbnail request for a pattern of 3 x 2 stitches
+    :param options:
+    :return:
+    """
+    data = base64.b64encode(bytes([1, 2, 1, 2, 1, 2])).decode()
+    return dict({'data': data, 'width': 3, 'format': 'png', 'resolution': 30, 'quality': 3}, **options)
+
+
+def test_cache_hit_skips_rendering(client):
+    first = client.post('/api/thumbnail', json=make_options())
+    second = client.post('/api/thumbnail', json=make_options())
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.data == second.data
+    assert client.render_calls() == 1
+
+    client.post('/api/thumbnail', json=make_options(resolution=60))
+    assert client.render_calls() == 2
+
+
+@pytest.mark.parametrize('image_format, content_type', [('png', 'image/png'), ('jpg', 'image/jpeg'),
+                                                        ('bmp', 'image/bmp'), ('gif', 'image/png')])
+def test_content_type_matches_format(client, image_format, content_type):
+    resp = client.post('/api/thumbnail', json=make_options(format=image_format))
+    assert resp.status_code == 200
+    assert resp.mimetype == content_type
+    image = cv2.imdecode(np.frombuffer(resp.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[:2] == (20, 30)
+
+
+def test_color_tints_image(client):
+    plain = client.post('/api/thumbnail', json=make_options(format='bmp'))
+    tinted = client.post('/api/thumbnail', json=make_options(format='bmp', color=[255, 0, 128]))
+    plain = cv2.imdecode(np.frombuffer(plain.data, dtype=np.uint8), cv2.IMREAD_COLOR).astype(int)
+    tinted = cv2.imdecode(np.frombuffer(tinted.data, dtype=np.uint8), cv2.IMREAD_COLOR).astype(int)
+    assert np.array_equal(tinted, plain * [128, 0, 255] // 255)
+
+
+@pytest.mark.parametrize('body', [
+    None,
+    [1, 2, 3],
+    make_options(data=''),
+    make_options(data='not base64!'),
+    make_options(width='wide'),
+    make_options(width=server.THUMBNAIL_MAX_DATA_LENGTH + 1),
+    make_options(resolution='high'),
+    make_options(color=['red', 'green', 'blue']),
+    make_options(color=[0, 0, 256]),
+    make_options(color=[0, 0]),
+    make_options(quality=[1]),
+])
+def test_bad_payload(client, body):
+    if body is None:
+        resp = client.post('/api/thumbnail', data='no json', content_type='text/plain')
+    else:
+        resp = client.post('/api/thumbnail', json=body)
+    assert resp.status_code == 400
+    assert 'error' in resp.get_json()
+    assert client.render_calls() == 0
@@ -0,0 +1,52 @@
+from thumbnail_cache import ThumbnailCache
+
+
+def make_renderer(image):
+    """
+    Helper method to create a renderer that records how often it was called
+    :param image:
+    :return:
+    """
+    def render():
+        render.calls += 1
+        return image
+    render.calls = 0
+    return render
+
+
+def test_hit_skips_rendering():
+    cache = ThumbnailCache(max_bytes=100)
+    key = cache.get_key(bytes([1, 2, 1, 2]), 2, format='png', resolution=200, quality=3, color=None)
+    render = make_renderer(b'image')
+    assert cache.get_or_render(key, render) == b'image'
+    assert cache.get_or_render(key, render) == b'image'
+    assert render.calls == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = ThumbnailCache(max_bytes=10)
+    cache.get_or_render('a', make_renderer(b'aaaa'))
+    cache.get_or_render('b', make_renderer(b'bbbb'))
+
+    # Use a, so b is the least recently used entry when c exceeds the budget
+    cache.get_or_render('a', make_renderer(b'aaaa'))
+    cache.get_or_render('c', make_renderer(b'cccc'))
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.current_bytes == 8
+
+    render = make_renderer(b'bbbb')
+    cache.get_or_render('b', render)
+    assert render.calls == 1
+
+
+def test_oversized_image_is_not_kept():
+    cache = ThumbnailCache(max_bytes=4)
+    cache.get_or_render('a', make_renderer(b'aaa'))
+    render = make_renderer(b'too large')
+    assert cache.get_or_render('b', render) == b'too large'
+    cache.get_or_render('b', render)
+    assert render.calls == 2
+    assert list(cache.entries) == ['a']
+    assert cache.current_bytes == 3
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class ThumbnailCache:
+    """
+    Least recently used cache for encoded images. Entries are addressed by a hash of the knitpaint data and the render
+    options. The cache is bounded by the total number of bytes of all stored images.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(data, width, **options):
+        """
+        Builds a content hash from the provided data, width and render options
+        :param data:
+        :param width:
+        :param options:
+        :return:
+        """
+        content_hash = hashlib.sha256(bytes(data))
+        content_hash.update(json.dumps([width, options], sort_keys=True).encode())
+        return content_hash.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached image for the provided key or None if it is not cached
+        :param key:
+        :return:
+        """
+        with self.lock:
+            image = self.entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        """
+        Stores an image and evicts the least recently used images until the byte budget is met. Images that exceed the
+        budget by themselves are not stored.
+        :param key:
+        :param image:
+        :return:
+        """
+        if len(image) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= len(self.entries.pop(key))
+            self.entries[key] = image
+            self.current_bytes += len(image)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def get_or_render(self, key, render):
+        """
+        Returns the cached image for the provided key. Calls render to create and cache the image if it is not cached
+        :param key:
+        :param render:
+        :return:
+        """
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+        return image